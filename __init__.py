@@ -10,9 +10,14 @@ bl_info = {
 
 import bpy
 from . import ui
+from . import analysis
 from . import core
+from . import bake
+from . import curves
+from . import follow
+from . import ground
 
-modules = [ui, core]
+modules = [ui, analysis, core, bake, curves, follow, ground]
 
 def register():
     for module in modules:
@@ -0,0 +1,401 @@
+import bpy
+import math
+import numpy as np
+import mathutils
+
+# (fit name, mesh pointer, vertex count, geometry hash) -> fit result in mesh space
+_fit_cache = {}
+
+# Angular sectors used to find the outline of a wheel around its axle
+ANGLE_BINS = 64
+
+# Largest wheel shaped objects considered when pairing up the wheels
+WHEEL_CANDIDATES = 32
+
+# Share of the fork (along its axis) taken as steerer tube
+STEERER_SHARE = 0.2
+# Variance ratio above which the steerer part is a tube with its own axis
+STEERER_ELONGATION = 4.0
+
+# Candidate circles tried and how far (relative to the radius) an outline point
+# may be from one to count as tire. Everything else is fender, mud flap etc.
+RANSAC_SAMPLES = 256
+RANSAC_TOLERANCE = 0.02
+
+
+def read_vertices(mesh):
+    """Vertex coordinates of a mesh as an (n, 3) array, read in one foreach_get call"""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+def geometry_key(mesh, co):
+    return (mesh.as_pointer(), len(co), hash(co.tobytes()))
+
+
+def fit_circle(x, y):
+    """Least squares (Kasa) circle fit, returns center x, center y and radius"""
+    A = np.column_stack((x, y, np.ones_like(x)))
+    (a, b, c), *_ = np.linalg.lstsq(A, x * x + y * y, rcond=None)
+    cx, cy = a / 2.0, b / 2.0
+    return cx, cy, math.sqrt(max(c + cx * cx + cy * cy, 0.0))
+
+
+def outer_points(x, y):
+    """Index of the outermost vertex in every angular sector around (0, 0)"""
+    r = np.hypot(x, y)
+    bins = ((np.arctan2(y, x) + math.pi) / (2 * math.pi) * ANGLE_BINS).astype(np.int64) % ANGLE_BINS
+    order = np.lexsort((r, bins))
+    last = np.r_[bins[order][1:] != bins[order][:-1], True]
+    return order[last], r
+
+
+def circles_through(x, y, triples):
+    """Circumcircles (cx, cy, r) of many point triples at once, degenerate ones get r = inf"""
+    ax, bx, cx = x[triples].T
+    ay, by, cy = y[triples].T
+    d = 2.0 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ux = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+        uy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    r = np.hypot(ax - ux, ay - uy)
+    r[~np.isfinite(r)] = np.inf
+    return ux, uy, r
+
+
+def fit_wheel(co):
+    """Fit the axle axis, axle center and rolling radius to a wheel's vertices.
+
+    The axle is the direction of least spread of the vertex cloud (a wheel is
+    a flat disc). In the wheel plane the outermost vertex of every angular
+    sector is taken and the circle through most of them (RANSAC over sampled
+    triples, all evaluated at once) is the tire. Sectors that belong to
+    fenders or brackets don't agree with it and are ignored in the final fit.
+    Returns center, axis, the two in-plane directions and the radius.
+    """
+    co = co.astype(np.float64)
+    center = co.mean(axis=0)
+    _, vecs = np.linalg.eigh(np.cov((co - center).T))
+    axis, v, u = vecs[:, 0], vecs[:, 1], vecs[:, 2]
+
+    d = co - center
+    x, y = d @ u, d @ v
+    idx, _ = outer_points(x, y)
+    px, py = x[idx], y[idx]
+
+    # Consensus circle, scored with a truncated squared error (MSAC) so that a
+    # circle through the tire beats one passing half way between tire and fender
+    rng = np.random.default_rng(0)
+    triples = np.array([rng.choice(len(idx), 3, replace=False) for _ in range(RANSAC_SAMPLES)])
+    ux, uy, r = circles_through(px, py, triples)
+    dist = np.abs(np.hypot(px[None, :] - ux[:, None], py[None, :] - uy[:, None]) - r[:, None])
+    tolerance = np.median(np.hypot(px, py)) * RANSAC_TOLERANCE
+    score = np.minimum(dist, tolerance) ** 2
+    best = dist[np.argmin(score.sum(axis=1))] <= tolerance
+
+    if best.sum() >= 3:
+        cx, cy, radius = fit_circle(px[best], py[best])
+    else:
+        cx, cy, radius = fit_circle(px, py)
+
+    # Center along the axle is the middle of the tire's width
+    t = d @ axis
+    center = center + cx * u + cy * v + axis * (t.min() + t.max()) / 2.0
+    return center, axis, u, v, radius
+
+
+def fit_fork(co):
+    """Fit the steering (head tube) axis to a fork's vertices.
+
+    The direction of most spread (legs and steerer tube) tells the ends of
+    the fork apart. The axis is then taken from the narrow top part, the
+    steerer tube, and passes through its middle rather than through the
+    centroid, which the legs pull forward.
+    Returns a point on the axis and the axis.
+    """
+    co = co.astype(np.float64)
+    center = co.mean(axis=0)
+    _, vecs = np.linalg.eigh(np.cov((co - center).T))
+    axis = vecs[:, 2]
+
+    t = (co - center) @ axis
+
+    def spread(mask):
+        # Size of the vertices across the axis
+        return np.linalg.norm(np.ptp(co[mask] - np.outer(t[mask], axis), axis=0))
+
+    # The steerer end is the narrow one
+    low = t <= np.quantile(t, STEERER_SHARE)
+    high = t >= np.quantile(t, 1.0 - STEERER_SHARE)
+    top = high
+    if spread(low) < spread(high):
+        top = low
+        axis = -axis
+
+    # Fork legs are usually offset forward, the steerer tube alone gives the
+    # true head tube angle when it is long enough to have a direction itself
+    steerer = co[top]
+    point = steerer.mean(axis=0)
+    vals, vecs = np.linalg.eigh(np.cov((steerer - point).T))
+    if vals[2] > STEERER_ELONGATION * vals[1]:
+        axis = vecs[:, 2] if vecs[:, 2] @ axis > 0 else -vecs[:, 2]
+
+    return point, axis
+
+
+def read_evaluated_vertices(obj):
+    """Local vertex coordinates of an object with its modifiers applied (Screw, Array, Solidify, ...)"""
+    obj_eval = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = obj_eval.to_mesh()
+    try:
+        return read_vertices(mesh)
+    finally:
+        obj_eval.to_mesh_clear()
+
+
+def get_fit(obj, fit):
+    """Object space fit of a mesh part with its modifiers, cached on the mesh datablock and the evaluated geometry.
+
+    None when there are too few vertices to fit.
+    """
+    co = read_evaluated_vertices(obj)
+    if len(co) < 8:
+        return None
+    key = (fit.__name__,) + geometry_key(obj.data, co)
+    if key not in _fit_cache:
+        _fit_cache[key] = fit(co)
+    return _fit_cache[key]
+
+
+def analyze_wheel(obj, matrix=None):
+    """Return the world space axle center, axle axis and rolling radius of a wheel.
+
+    The mesh is read with its modifiers. Which way the axis points is left to
+    analyze_parts. Objects without usable mesh data fall back to the origin,
+    the local X axis and half the height.
+    """
+    matrix = matrix if matrix is not None else obj.matrix_world
+    rot = matrix.to_3x3()
+
+    fit = get_fit(obj, fit_wheel) if obj.type == 'MESH' else None
+    if fit is None:
+        radius = obj.dimensions.z / 2.0
+        if radius <= 0.01: radius = 0.3
+        return matrix.translation.copy(), (rot @ mathutils.Vector((1, 0, 0))).normalized(), radius
+
+    center, axis, u, v, radius = fit
+    world_axis = (rot @ mathutils.Vector(axis)).normalized()
+
+    # Object scale along the wheel plane
+    scale = ((rot @ mathutils.Vector(u)).length + (rot @ mathutils.Vector(v)).length) / 2.0
+    radius = radius * scale
+    if radius <= 0.01: radius = 0.3
+
+    return matrix @ mathutils.Vector(center), world_axis, radius
+
+
+def analyze_fork(obj, matrix=None):
+    """Return a world space point on the steering axis and the axis (pointing up).
+
+    Objects without usable mesh data fall back to their origin and a vertical axis.
+    """
+    matrix = matrix if matrix is not None else obj.matrix_world
+
+    fit = get_fit(obj, fit_fork) if obj.type == 'MESH' else None
+    if fit is None:
+        return matrix.translation.copy(), mathutils.Vector((0, 0, 1))
+
+    point, axis = fit
+
+    world_axis = (matrix.to_3x3() @ mathutils.Vector(axis)).normalized()
+    if world_axis.z < 0:
+        world_axis.negate()
+    return matrix @ mathutils.Vector(point), world_axis
+
+
+def get_steering_geometry(fits):
+    """Rake (head angle from vertical, degrees), trail and fork offset of a bike.
+
+    Trail is measured on the ground under the front wheel, positive when the
+    contact point is behind where the steering axis meets the ground.
+    """
+    point, axis = fits["fork"]
+    f_center, _, f_radius = fits["front_wheel"]
+    b_center, _, _ = fits["back_wheel"]
+
+    forward = f_center - b_center
+    forward.z = 0
+    if forward.length < 1e-6:
+        return 0.0, 0.0, 0.0
+    forward.normalize()
+
+    rake = math.degrees(axis.angle(mathutils.Vector((0, 0, 1))))
+
+    contact = f_center - mathutils.Vector((0, 0, f_radius))
+    if abs(axis.z) < 1e-6:
+        trail = 0.0
+    else:
+        ground = point + axis * ((contact.z - point.z) / axis.z)
+        trail = (ground - contact).dot(forward)
+
+    # Distance of the axle from the steering axis
+    to_axle = f_center - point
+    offset = (to_axle - axis * to_axle.dot(axis)).length
+
+    return rake, trail, offset
+
+
+def analyze_parts(parts, rests):
+    """Mesh analysis of a bike's wheels and (if any) fork, keyed by role.
+
+    Both axles point to the right of the bike (rear to front wheel), so the
+    wheel bones spin the same way whichever way the model faces.
+    """
+    fits = {role: analyze_wheel(parts[role], rests[role]) for role in ("front_wheel", "back_wheel")}
+    right = (fits["front_wheel"][0] - fits["back_wheel"][0]).cross(mathutils.Vector((0, 0, 1)))
+    if right.length > 1e-6:
+        for role in ("front_wheel", "back_wheel"):
+            center, axis, radius = fits[role]
+            if axis.dot(right) < 0:
+                fits[role] = (center, -axis, radius)
+    if parts.get("fork"):
+        fits["fork"] = analyze_fork(parts["fork"], rests["fork"])
+    return fits
+
+
+def read_bounds(objects):
+    """World matrices, world AABBs and scaled local dimensions of a collection of objects.
+
+    Everything is read with foreach_get, so there is no per object Python work.
+    Returns matrices (n, 4, 4), world min and max (n, 3) and dims (n, 3).
+    """
+    n = len(objects)
+    matrices = np.empty(n * 16, dtype=np.float32)
+    objects.foreach_get("matrix_world", matrices)
+    # foreach_get flattens matrices column by column
+    matrices = matrices.reshape(n, 4, 4).transpose(0, 2, 1)
+
+    corners = np.empty(n * 24, dtype=np.float32)
+    objects.foreach_get("bound_box", corners)
+    corners = corners.reshape(n, 8, 3)
+
+    world = np.einsum('nij,nkj->nki', matrices[:, :3, :3], corners) + matrices[:, None, :3, 3]
+    scale = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    dims = (corners.max(axis=1) - corners.min(axis=1)) * scale
+    return matrices, world.min(axis=1), world.max(axis=1), dims
+
+
+def detect_parts(objects):
+    """Find frame, wheels, fork and handlebar among a bike's objects by their geometry.
+
+    objects is a bpy_prop_collection (e.g. collection.all_objects). All tests
+    run on arrays of every object's matrix and bounds at once:
+    wheels are the largest matching pair of round, thin objects with
+    horizontal axles side by side, the frame is the largest object between
+    them, the handlebar the widest object (along the axles) above them, the
+    wheel under it is the front one and the fork is the tallest object
+    reaching down to the front axle. Returns a role dict like core.get_parts.
+    """
+    parts = {"frame": None, "front_wheel": None, "back_wheel": None, "fork": None, "handlebar": None}
+    if len(objects) < 3:
+        return parts
+
+    matrices, lo, hi, dims = read_bounds(objects)
+    center = (lo + hi) / 2.0
+    is_mesh = np.array([o.type == 'MESH' for o in objects])
+    size = np.linalg.norm(hi - lo, axis=1)
+    bike_size = np.linalg.norm(hi[is_mesh].max(axis=0) - lo[is_mesh].min(axis=0)) if is_mesh.any() else 0.0
+
+    # 1. Wheel candidates: two equal large dimensions, one thin one, axle horizontal
+    order = np.argsort(-dims, axis=1)
+    d = np.take_along_axis(dims, order, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        round_ = d[:, 1] / d[:, 0]
+        thin = d[:, 2] / d[:, 0]
+    axles = np.take_along_axis(matrices[:, :3, :3], order[:, None, 2:3], axis=2)[:, :, 0]
+    axles /= np.maximum(np.linalg.norm(axles, axis=1, keepdims=True), 1e-9)
+    wheel_like = (is_mesh & (round_ > 0.9) & (thin < 0.5) & (np.abs(axles[:, 2]) < 0.5)
+                  & (d[:, 0] > 0.1 * bike_size))
+    cand = np.flatnonzero(wheel_like)
+    cand = cand[np.argsort(-d[cand, 0])][:WHEEL_CANDIDATES]
+    if len(cand) < 2:
+        return parts
+
+    # 2. Best pair: similar diameter and height, parallel axles, side by side
+    a, b = np.meshgrid(cand, cand, indexing='ij')
+    diam = d[:, 0]
+    sep = center[b] - center[a]
+    dist = np.linalg.norm(sep, axis=2)
+    valid = ((a < b)
+             & (np.minimum(diam[a], diam[b]) > 0.8 * np.maximum(diam[a], diam[b]))
+             & (np.abs(sep[:, :, 2]) < 0.25 * diam[a])
+             & (np.abs(np.einsum('ijk,ijk->ij', axles[a], axles[b])) > 0.9)
+             & (np.abs(np.einsum('ijk,ijk->ij', sep, axles[a])) < 0.25 * dist)
+             & (dist > 1.05 * diam[a]) & (dist < 4.0 * diam[a]))
+    if not valid.any():
+        return parts
+    score = np.where(valid, diam[a] + diam[b], -np.inf)
+    i, j = np.unravel_index(np.argmax(score), score.shape)
+    wa, wb = a[i, j], b[i, j]
+    radius = diam[[wa, wb]].max() / 2.0
+
+    # Everything sitting on an axle (rims, spokes, discs) belongs to a wheel
+    rest = is_mesh.copy()
+    for w in (wa, wb):
+        rest &= np.linalg.norm(center - center[w], axis=1) > 0.5 * radius
+
+    forward = center[wb] - center[wa]
+    forward[2] = 0.0
+    length = np.linalg.norm(forward)
+    forward /= length
+    axle = axles[wa]
+    along = (center - center[wa]) @ forward / length
+
+    # 3. Frame: largest object between the wheels
+    frame = np.where(rest & (along > 0.0) & (along < 1.0), size, -np.inf)
+    if np.isfinite(frame.max()):
+        f = int(np.argmax(frame))
+        parts["frame"] = objects[f]
+        rest[f] = False
+
+    # 4. Handlebar: widest across the bike, above the wheels
+    axle_z = max(center[wa, 2], center[wb, 2])
+    width = np.abs((hi - lo) @ np.abs(axle))
+    handle = np.where(rest & (center[:, 2] > axle_z + radius), width, -np.inf)
+    front, back = wb, wa
+    if np.isfinite(handle.max()):
+        h = int(np.argmax(handle))
+        parts["handlebar"] = objects[h]
+        rest[h] = False
+        if along[h] < 0.5:
+            front, back = wa, wb
+    elif forward[1] > 0:
+        # No handlebar to tell, models usually face -Y
+        front, back = wa, wb
+
+    parts["front_wheel"] = objects[int(front)]
+    parts["back_wheel"] = objects[int(back)]
+
+    # 5. Fork: tallest object reaching down to the front axle
+    gap = np.linalg.norm(np.clip(center[front], lo, hi) - center[front], axis=1)
+    fork = np.where(rest & (gap < 0.25 * radius) & (hi[:, 2] > center[front, 2] + 0.5 * radius),
+                    hi[:, 2] - lo[:, 2], -np.inf)
+    if np.isfinite(fork.max()):
+        parts["fork"] = objects[int(np.argmax(fork))]
+
+    return parts
+
+
+@bpy.app.handlers.persistent
+def clear_caches(*args):
+    _fit_cache.clear()
+
+
+def register():
+    bpy.app.handlers.load_post.append(clear_caches)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(clear_caches)
+    clear_caches()
@@ -0,0 +1,750 @@
+import bpy
+import math
+import numpy as np
+
+from . import core
+from . import ground
+from . import kinematics
+from . import sampler
+
+WHEEL_BONES = ("f_wheel", "b_wheel")
+STEER_BONE = "steer"
+FRAME_BONE = "frame"
+SUSPENSION_BONES = ("f_susp", "b_susp")
+
+GRAVITY = 9.81
+# Lean beyond which the rider's lean offset is fully applied
+LEAN_BLEND = math.radians(5.0)
+
+# Rear contact speed (units per frame) below which the path has no usable curvature
+MIN_SPEED = 1e-3
+
+# Frames the acceleration loading the suspension is averaged over
+ACCEL_SMOOTHING = 5
+
+# (rig pointer, wheel bone, first frame, last frame, animation fingerprint) -> rolled distance per frame
+_distance_cache = {}
+
+
+def is_rig(obj):
+    return obj is not None and obj.type == 'ARMATURE' and "root" in obj.data.bones
+
+
+def get_rigs(context):
+    """The selected BikeRig rigs, or the active one"""
+    rigs = [o for o in context.selected_objects if is_rig(o)]
+    if not rigs and is_rig(context.object):
+        rigs = [context.object]
+    return rigs
+
+
+def get_frames(scene):
+    return np.arange(scene.frame_start, scene.frame_end + 1, dtype=np.float64)
+
+
+def get_action(obj):
+    anim = obj.animation_data or obj.animation_data_create()
+    if not anim.action:
+        anim.action = bpy.data.actions.new(obj.name + "Action")
+    return anim.action
+
+
+def find_fcurve(obj, data_path, index):
+    action = obj.animation_data.action if obj.animation_data else None
+    return action.fcurves.find(data_path, index=index) if action else None
+
+
+def set_interpolation(points, interpolation):
+    try:
+        points.foreach_set("interpolation", np.full(len(points), sampler.INTERPOLATIONS[interpolation], dtype=np.int32))
+    except (TypeError, RuntimeError):
+        for point in points:
+            point.interpolation = interpolation
+
+
+def write_keys(obj, data_path, index, frames, values, group="", interpolation='LINEAR'):
+    """Replace a channel with one key per frame.
+
+    Keys are allocated at once and filled with foreach_set (co, handles,
+    interpolation), the F-curve is updated a single time at the end. Works for
+    object and pose bone channels alike.
+    """
+    action = get_action(obj)
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    # Handles a third of the way to the neighbouring keys
+    prev = np.concatenate((co[:1], co[:-1]))
+    following = np.concatenate((co[1:], co[-1:]))
+
+    points = fcurve.keyframe_points
+    points.add(len(frames))
+    points.foreach_set("co", co.ravel())
+    points.foreach_set("handle_left", (co + (prev - co) / 3.0).ravel())
+    points.foreach_set("handle_right", (co + (following - co) / 3.0).ravel())
+    set_interpolation(points, interpolation)
+    fcurve.update()
+    return fcurve
+
+
+def write_vector(obj, data_path, frames, values, group="", interpolation='LINEAR'):
+    """Bake a (frames, n) array to the n channels of a vector property"""
+    return [write_keys(obj, data_path, i, frames, values[:, i], group, interpolation) for i in range(values.shape[1])]
+
+
+def decimate(x, y, tolerance):
+    """Keys to keep so linear interpolation between them stays within tolerance of every sample.
+
+    Ramer-Douglas-Peucker, breadth first: every pass splits all segments
+    still out of tolerance at their worst sample at once. Returns the kept
+    indices and the largest remaining error.
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[0, -1]] = True
+    while True:
+        index = np.flatnonzero(keep)
+        segment = np.clip(np.searchsorted(index, np.arange(len(x)), side='right') - 1, 0, len(index) - 2)
+        x0, x1 = x[index[segment]], x[index[segment + 1]]
+        y0, y1 = y[index[segment]], y[index[segment + 1]]
+        error = np.abs(y - (y0 + (y1 - y0) * (x - x0) / (x1 - x0)))
+        error[keep] = 0.0
+        if error.max() <= tolerance:
+            return index, float(error.max())
+
+        # First sample with the largest error of every segment that is out of tolerance
+        worst = np.maximum.reduceat(error, index[:-1])
+        split = np.flatnonzero((error == worst[segment]) & (error > tolerance))
+        _, first = np.unique(segment[split], return_index=True)
+        keep[split[first]] = True
+
+
+def decimate_fcurves(obj, fcurves, tolerance):
+    """Thin freshly baked channels to the keys needed to stay within tolerance (in channel units).
+
+    Returns the key count before and after and the largest error. A tolerance
+    of 0 keeps every key.
+    """
+    before = after = 0
+    error = 0.0
+    for fcurve in fcurves:
+        co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float64)
+        fcurve.keyframe_points.foreach_get("co", co)
+        co = co.reshape(-1, 2)
+        before += len(co)
+        if tolerance <= 0.0 or len(co) < 3:
+            after += len(co)
+            continue
+
+        keep, err = decimate(co[:, 0], co[:, 1], tolerance)
+        if len(keep) < len(co):
+            write_keys(obj, fcurve.data_path, fcurve.array_index, co[keep, 0], co[keep, 1],
+                       fcurve.group.name if fcurve.group else "")
+        after += len(keep)
+        error = max(error, err)
+    return before, after, error
+
+
+def decimation_report(stats):
+    """Summary of decimate_fcurves results for the operator reports"""
+    before = sum(s[0] for s in stats)
+    after = sum(s[1] for s in stats)
+    error = max((s[2] for s in stats), default=0.0)
+    return f"{before} -> {after} keys ({before / max(after, 1):.1f}x), max error {error:.2g}"
+
+
+def spin_path(bone_name):
+    return f'pose.bones["{bone_name}"].rotation_euler'
+
+
+def animation_fingerprint(obj):
+    """Hash of everything that moves a rig's wheels, None if that can't be told from the data.
+
+    Its keys (except baked spin) with their handles, interpolation and
+    extrapolation, its placement and parents, the rest pose of the wheel
+    bones and every bone above them, and the wheel radii. F-curve modifiers
+    have too many settings to hash, rigs using them get None.
+    """
+    parts = []
+    for bone_name in sampler.bone_chain(obj, ("root",) + WHEEL_BONES):
+        parts.append(tuple(v for row in obj.data.bones[bone_name].matrix_local for v in row))
+    parts.append(tuple(core.get_wheel_radius(obj, b) for b in WHEEL_BONES))
+    while obj:
+        parts.append(tuple(v for row in obj.matrix_basis for v in row))
+        action = obj.animation_data.action if obj.animation_data else None
+        for fcurve in action.fcurves if action else ():
+            if fcurve.data_path.endswith("rotation_euler") and any(b in fcurve.data_path for b in WHEEL_BONES):
+                continue
+            if len(fcurve.modifiers):
+                return None
+            keys = sampler.read_keys(fcurve)
+            parts.append((fcurve.data_path, fcurve.array_index, fcurve.extrapolation, fcurve.mute)
+                         + tuple(hash(a.tobytes()) for a in keys.values()))
+        obj = obj.parent
+    return hash(tuple(parts))
+
+
+def get_rolled_distances(context, rigs, frames):
+    """Rolled distance per frame of every wheel of the rigs, {(rig name, bone): array}.
+
+    Distances are cached on the rig's animation fingerprint, only rigs whose
+    animation changed are sampled again. Rigs that need the depsgraph
+    (constraints, drivers, ...) or use F-curve modifiers depend on more than
+    the fingerprint covers and are always sampled.
+    """
+    # The live spin drivers don't move the wheel centers or axles
+    skip = [(spin_path(b), core.SPIN_AXIS) for b in WHEEL_BONES]
+
+    out = {}
+    todo = []
+    keys = {}
+    for arm_obj in rigs:
+        fingerprint = animation_fingerprint(arm_obj) if sampler.can_sample(arm_obj, WHEEL_BONES, skip) else None
+        if fingerprint is None:
+            todo.append(arm_obj)
+            continue
+        for bone_name in WHEEL_BONES:
+            key = (arm_obj.as_pointer(), bone_name, frames[0], frames[-1], fingerprint)
+            keys[(arm_obj.name, bone_name)] = key
+            if key in _distance_cache:
+                out[(arm_obj.name, bone_name)] = _distance_cache[key]
+        if any((arm_obj.name, b) not in out for b in WHEEL_BONES):
+            todo.append(arm_obj)
+
+    if not todo:
+        return out
+
+    samples = sampler.sample_bones(context, todo, WHEEL_BONES, frames, skip)
+    for arm_obj in todo:
+        for bone_name in WHEEL_BONES:
+            matrices = samples[(arm_obj.name, bone_name)]
+            centers = matrices[:, :3, 3]
+            axles = kinematics.normalize(matrices[:, :3, 1])
+            radius = core.get_wheel_radius(arm_obj, bone_name)
+
+            points = kinematics.contact_points(centers, axles, radius)
+            dist = kinematics.rolled_distance(points, axles)
+
+            key = keys.get((arm_obj.name, bone_name))
+            if key:
+                _distance_cache[key] = dist
+            out[(arm_obj.name, bone_name)] = dist
+
+    return out
+
+
+def get_forward(arm_obj):
+    """The bike's forward direction in armature space, level, from the rear to the front wheel at rest"""
+    front, rear = (np.array(arm_obj.data.bones[b].head_local) for b in WHEEL_BONES)
+    forward = front - rear
+    forward[2] = 0.0
+    return kinematics.normalize(forward)
+
+
+def get_rear_paths(context, rigs, frames):
+    """Rear wheel path of the rigs, {rig name: dict} of per frame arrays.
+
+    "curvature" (signed, positive turning left, flipped when reversing),
+    "speed" (units per frame) and "moving", plus the rig's "wheelbase"
+    measured between the wheel bones.
+    """
+    skip = [(spin_path(b), core.SPIN_AXIS) for b in WHEEL_BONES]
+    samples = sampler.sample_bones(context, rigs, ("root",) + WHEEL_BONES, frames, skip)
+
+    out = {}
+    for arm_obj in rigs:
+        root = samples[(arm_obj.name, "root")]
+        rest = np.array(arm_obj.data.bones["root"].matrix_local.inverted())
+        forward = kinematics.normalize((root @ rest)[:, :3, :3] @ get_forward(arm_obj))
+
+        front = samples[(arm_obj.name, "f_wheel")]
+        rear = samples[(arm_obj.name, "b_wheel")]
+        wheelbase = np.linalg.norm(front[:, :3, 3] - rear[:, :3, 3], axis=1).mean()
+
+        axles = kinematics.normalize(rear[:, :3, 1])
+        points = kinematics.contact_points(rear[:, :3, 3], axles, core.get_wheel_radius(arm_obj, "b_wheel"))
+        curvature, velocity = kinematics.path_curvature(points, frames)
+        direction = np.where(np.sum(velocity * forward, axis=1) < 0.0, -1.0, 1.0)
+        speed = np.linalg.norm(velocity[:, :2], axis=1)
+
+        out[arm_obj.name] = {
+            "curvature": curvature * direction,
+            "speed": speed,
+            "moving": speed > MIN_SPEED,
+            "wheelbase": wheelbase,
+        }
+    return out
+
+
+def get_steer_angles(context, rigs, frames):
+    """Steering angle per frame of the rigs from their rear wheel path, {rig name: array}.
+
+    Kinematic bicycle model: the rear contact point path's curvature and the
+    wheelbase give the steering angle. While the bike stands still the last
+    angle is held.
+    """
+    out = {}
+    paths = get_rear_paths(context, rigs, frames)
+    for arm_obj in rigs:
+        path = paths[arm_obj.name]
+        rake = math.radians(arm_obj.get("bikerig_rake", 0.0))
+        angles = kinematics.steer_angle(path["curvature"], path["wheelbase"], rake)
+        out[arm_obj.name] = kinematics.hold(angles, path["moving"])
+    return out
+
+
+def bake_steering(arm_obj, frames, angles):
+    """Key the steer bone's rotation about its Y (the steering axis)"""
+    return [write_keys(arm_obj, sampler.bone_path(STEER_BONE, "rotation_euler"), 1, frames, angles[arm_obj.name], STEER_BONE)]
+
+
+def get_lean_angles(context, rigs, frames, smoothing=1, offset=0.0):
+    """Lean angle per frame of the rigs, {rig name: array}, positive leaning left.
+
+    atan(v^2 / (g * r)) from the rear wheel path, in meters and seconds
+    through the scene's unit scale and frame rate, averaged over smoothing
+    frames. offset leans further into the turn (or less when negative),
+    blended in over the first few degrees so going straight stays upright.
+    """
+    scene = context.scene
+    fps = scene.render.fps / scene.render.fps_base
+    scale = scene.unit_settings.scale_length
+
+    out = {}
+    paths = get_rear_paths(context, rigs, frames)
+    for arm_obj in rigs:
+        path = paths[arm_obj.name]
+        lean = kinematics.lean_angle(path["curvature"] / scale, path["speed"] * fps * scale, GRAVITY)
+        lean = kinematics.smooth(lean, smoothing)
+        if offset:
+            lean = lean + offset * np.tanh(lean / LEAN_BLEND)
+        out[arm_obj.name] = lean
+    return out
+
+
+def bone_axis(arm_obj, bone_name, direction):
+    """Euler index and sign of an armature space direction in a bone's rest space"""
+    rest = np.array(arm_obj.data.bones[bone_name].matrix_local.to_3x3())
+    local = rest.T @ np.asarray(direction, dtype=np.float64)
+    index = int(np.argmax(np.abs(local)))
+    return index, float(np.sign(local[index]))
+
+
+def euler_rigs(rigs, bone_name):
+    """The rigs whose bone rotates with Euler angles (what the bakes key) and how many others were left out.
+
+    Quaternion and axis angle bones aren't switched over, their keys would
+    stop counting.
+    """
+    out = [r for r in rigs if r.pose.bones[bone_name].rotation_mode not in {'QUATERNION', 'AXIS_ANGLE'}]
+    return out, len(rigs) - len(out)
+
+
+def bake_lean(arm_obj, frames, angles):
+    """Key the frame bone's roll about the bike's forward axis (see get_forward).
+
+    The frame pivots on its own origin, so its location is keyed too: the
+    bike then rolls about the ground line under the frame and the wheels stay
+    on the ground.
+    """
+    bone = arm_obj.data.bones[FRAME_BONE]
+    rest = np.array(bone.matrix_local.to_3x3())
+    forward = get_forward(arm_obj)
+    # Leaning left (positive) turns the top to the left: negative about forward
+    roll = -angles[arm_obj.name]
+
+    ground = min(arm_obj.data.bones[b].head_local.z - core.get_wheel_radius(arm_obj, b) for b in WHEEL_BONES)
+    height = bone.head_local.z - ground
+    # The frame origin swings sideways (to the right of forward for a positive roll) and drops
+    right = np.cross(forward, kinematics.UP)
+    shift = (height * np.sin(roll))[:, None] * right
+    shift[:, 2] += height * (np.cos(roll) - 1.0)
+
+    index, sign = bone_axis(arm_obj, FRAME_BONE, forward)
+    fcurves = [write_keys(arm_obj, sampler.bone_path(FRAME_BONE, "rotation_euler"), index, frames, sign * roll, FRAME_BONE)]
+    # Pose location is in the bone's rest space
+    return fcurves + write_vector(arm_obj, sampler.bone_path(FRAME_BONE, "location"), frames, shift @ rest, FRAME_BONE)
+
+
+def get_contacts(arm_obj):
+    """Front and rear ground contact points of a rig at rest, in armature space"""
+    out = []
+    for bone_name in WHEEL_BONES:
+        head = np.array(arm_obj.data.bones[bone_name].head_local)
+        head[2] -= core.get_wheel_radius(arm_obj, bone_name)
+        out.append(head)
+    return out
+
+
+def get_pitch_axis(arm_obj):
+    """Armature space axis the bike pitches nose up about: level, to the right of the wheelbase"""
+    front, rear = get_contacts(arm_obj)
+    return kinematics.normalize(np.cross(front - rear, kinematics.UP))
+
+
+def get_root_motion(arm_obj, frames, pitch_index=None):
+    """(frames, 4, 4) armature space motion of the root from its keys, leaving out the pitch if its index is given"""
+    pbone = arm_obj.pose.bones["root"]
+    loc = sampler.sample_property(arm_obj, sampler.bone_path("root", "location"), pbone.location, frames)
+    rot = sampler.sample_property(arm_obj, sampler.bone_path("root", "rotation_euler"), pbone.rotation_euler, frames)
+    if pitch_index is not None:
+        rot[:, pitch_index] = 0.0
+
+    basis = np.zeros((len(frames), 4, 4))
+    basis[:, :3, :3] = sampler.euler_matrices(rot, pbone.rotation_mode)
+    basis[:, :3, 3] = loc
+    basis[:, 3, 3] = 1.0
+    rest = np.array(arm_obj.data.bones["root"].matrix_local)
+    return rest @ basis @ np.linalg.inv(rest)
+
+
+def get_terrain_contacts(context, rigs, frames, flat=False):
+    """Where the rigs' wheels touch the ground, {rig name: (root motion, front z, rear z)}.
+
+    The contact points under the root's motion (without pitch) of all rigs,
+    both wheels and all frames are queried in one batch; the ground heights
+    come back in armature space. The rig's placement per frame (object keys,
+    parents, constraints) comes from the sampled root. Frames without ground
+    under a wheel keep the last height found. Rigs with no ground at all are
+    left out, or with flat ride on the plane their contact points rest on.
+    """
+    samples = sampler.sample_bones(context, rigs, ("root",), frames)
+    motions = {}
+    worlds = {}
+    points = []
+    for arm_obj in rigs:
+        pitch_index, _ = bone_axis(arm_obj, "root", get_pitch_axis(arm_obj))
+        motion = get_root_motion(arm_obj, frames, pitch_index)
+
+        # The armature's world matrix per frame: the sampled root without its own keyed motion
+        rest = np.array(arm_obj.data.bones["root"].matrix_local)
+        keyed = get_root_motion(arm_obj, frames) @ rest
+        world = samples[(arm_obj.name, "root")] @ np.linalg.inv(keyed)
+
+        placed = world @ motion
+        contacts = np.stack([placed[:, :3, :3] @ c + placed[:, :3, 3] for c in get_contacts(arm_obj)], axis=1)
+        motions[arm_obj.name] = motion
+        worlds[arm_obj.name] = world
+        points.append(contacts)
+
+    points = np.stack(points)
+    found = ground.ground_under(context, points)
+    if found is None:
+        if not flat:
+            return {}
+        found = (points[..., 2], None, np.zeros(points.shape[:-1], dtype=bool))
+    heights, _, hits = found
+
+    out = {}
+    for arm_obj, contacts, height, hit in zip(rigs, points, heights, hits):
+        if not hit.any():
+            if flat:
+                rest_front, rest_rear = get_contacts(arm_obj)
+                out[arm_obj.name] = (motions[arm_obj.name], np.full(len(frames), rest_front[2]),
+                                     np.full(len(frames), rest_rear[2]))
+            continue
+        ground_points = contacts.copy()
+        ground_points[..., 2] = np.where(hit, height, contacts[..., 2])
+        inverse = np.linalg.inv(worlds[arm_obj.name])
+        local_z = np.sum(ground_points * inverse[:, None, 2, :3], axis=2) + inverse[:, None, 2, 3]
+        front_z = kinematics.hold(local_z[:, 0], hit[:, 0]) if hit[:, 0].any() else local_z[:, 0]
+        rear_z = kinematics.hold(local_z[:, 1], hit[:, 1]) if hit[:, 1].any() else local_z[:, 1]
+        out[arm_obj.name] = (motions[arm_obj.name], front_z, rear_z)
+    return out
+
+
+def bake_terrain(arm_obj, frames, motion, front_z, rear_z):
+    """Key the root's pitch and location so both wheels sit on the ground.
+
+    The bike pitches about its rear contact point by the slope between the
+    two contacts, then the root is lifted until the rear wheel touches.
+    The root's heading and ground position keys are kept, its height and
+    pitch are replaced.
+    """
+    rest_front, rest_rear = get_contacts(arm_obj)
+    wheelbase = rest_front - rest_rear
+    length = np.linalg.norm(wheelbase)
+    pitch = np.arcsin(np.clip((front_z - rear_z) / length, -1.0, 1.0)) - math.asin(wheelbase[2] / length)
+
+    # Pitch about the bike's side axis through the rear contact, positive lifts the front
+    axis = get_pitch_axis(arm_obj)
+    turn = np.zeros((len(frames), 4, 4))
+    turn[:, :3, :3] = kinematics.axis_rotations(axis, pitch)
+    turn[:, 3, 3] = 1.0
+    turn[:, :3, 3] = rest_rear - turn[:, :3, :3] @ rest_rear
+    placed = motion @ turn
+    placed[:, 2, 3] += rear_z - (placed[:, :3, :3] @ rest_rear + placed[:, :3, 3])[:, 2]
+
+    rest = np.array(arm_obj.data.bones["root"].matrix_local)
+    basis = np.linalg.inv(rest) @ placed @ rest
+    index, sign = bone_axis(arm_obj, "root", axis)
+    fcurves = [write_keys(arm_obj, sampler.bone_path("root", "rotation_euler"), index, frames, sign * pitch, "root")]
+    return fcurves + write_vector(arm_obj, sampler.bone_path("root", "location"), frames, basis[:, :3, 3], "root")
+
+
+def get_suspension(context, rigs, frames):
+    """Spring-damper suspension of the rigs, {rig name: (root motion, body heights, compressions)}.
+
+    Both wheels of every rig are simulated together (see
+    kinematics.spring_damper), fed by the ground under them (flat without a
+    ground collection) and by the load transfer of the rear contact's
+    acceleration along the bike. Body heights and compressions are
+    (front, rear) pairs of per frame arrays in armature units.
+    """
+    scene = context.scene
+    props = scene.bikerig_props
+    fps = scene.render.fps / scene.render.fps_base
+    scale = scene.unit_settings.scale_length
+    step = frames[1] - frames[0] if len(frames) > 1 else 1
+    contacts = get_terrain_contacts(context, rigs, frames, flat=True)
+
+    grounds, loads = [], []
+    for arm_obj in rigs:
+        motion, front_z, rear_z = contacts[arm_obj.name]
+        rest_front, rest_rear = get_contacts(arm_obj)
+
+        # Speed (m/s) and acceleration of the rear contact along the heading
+        rear = motion[:, :3, :3] @ rest_rear + motion[:, :3, 3]
+        heading = motion[:, :3, :3] @ get_forward(arm_obj)
+        speed = np.sum(np.gradient(rear, frames, axis=0) * heading, axis=1) * fps * scale
+        accel = kinematics.smooth(np.gradient(speed, frames) * fps, ACCEL_SMOOTHING)
+
+        height = arm_obj.data.bones[FRAME_BONE].head_local.z - min(rest_front[2], rest_rear[2])
+        front, back = kinematics.load_transfer(accel, height, np.linalg.norm(rest_front - rest_rear),
+                                               props.suspension_frequency)
+        grounds += [front_z, rear_z]
+        loads += [front / scale, back / scale]
+
+    compression, body = kinematics.spring_damper(
+        np.array(grounds), np.array(loads), step / fps, props.suspension_frequency, props.suspension_damping,
+        props.suspension_travel / scale, props.suspension_extension / scale)
+
+    return {arm_obj.name: (contacts[arm_obj.name][0], body[2 * i:2 * i + 2], compression[2 * i:2 * i + 2])
+            for i, arm_obj in enumerate(rigs)}
+
+
+def bake_suspension(arm_obj, frames, motion, body, compression):
+    """Key the suspension travel and the body riding on it.
+
+    The root is placed like bake_terrain does, on the sprung body heights
+    instead of the ground, then each suspension bone slides its wheel back
+    down onto the ground along its travel axis.
+    """
+    fcurves = bake_terrain(arm_obj, frames, motion, *body)
+    for bone_name, travel in zip(SUSPENSION_BONES, compression):
+        # Travel along the bone's Y, which is tilted by the rake at the front
+        slope = np.array(arm_obj.data.bones[bone_name].matrix_local)[2, 1]
+        fcurves.append(write_keys(arm_obj, sampler.bone_path(bone_name, "location"), 1, frames, travel / slope, bone_name))
+    return fcurves
+
+
+def is_spin_baked(arm_obj):
+    fcurve = core.get_driver(arm_obj, WHEEL_BONES[0])
+    return bool(fcurve and fcurve.mute)
+
+
+def bake_wheel_spin(arm_obj, frames, distances):
+    """Key the wheel rotation from each wheel's rolled distance, then mute the spin drivers.
+
+    Unlike the driver, which only follows the root along the forward axis,
+    every wheel turns by the arc length its own contact point travels, so
+    turns, climbs and object level animation are taken into account.
+    """
+    fcurves = []
+    for bone_name in WHEEL_BONES:
+        radius = core.get_wheel_radius(arm_obj, bone_name)
+        dist = distances[(arm_obj.name, bone_name)]
+        # Same sign as the driver: rolling towards +Y turns negative
+        fcurves.append(write_keys(arm_obj, spin_path(bone_name), core.SPIN_AXIS, frames, -dist / radius, bone_name))
+
+        driver = core.get_driver(arm_obj, bone_name)
+        if driver:
+            driver.mute = True
+    return fcurves
+
+
+def live_wheel_spin(arm_obj):
+    """Drop the baked wheel rotation and let the spin drivers run again"""
+    action = arm_obj.animation_data.action if arm_obj.animation_data else None
+    for bone_name in WHEEL_BONES:
+        fcurve = action.fcurves.find(spin_path(bone_name), index=core.SPIN_AXIS) if action else None
+        if fcurve:
+            action.fcurves.remove(fcurve)
+
+        driver = core.get_driver(arm_obj, bone_name)
+        if driver:
+            driver.mute = False
+
+
+class BikeRig_OT_BakeWheelSpin(bpy.types.Operator):
+    """Bake the wheel rotation of the selected rigs to keys over the scene range (mutes the spin drivers)"""
+    bl_idname = "bikerig.bake_wheel_spin"
+    bl_label = "Bake Wheel Spin"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = get_rigs(context)
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig!")
+            return {'CANCELLED'}
+
+        tolerance = context.scene.bikerig_props.bake_tolerance
+        frames = get_frames(context.scene)
+        distances = get_rolled_distances(context, rigs, frames)
+        stats = [decimate_fcurves(r, bake_wheel_spin(r, frames, distances), tolerance) for r in rigs]
+
+        self.report({'INFO'}, f"Wheel spin baked on {len(rigs)} rigs, {decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+class BikeRig_OT_LiveWheelSpin(bpy.types.Operator):
+    """Go back to driver based wheel rotation on the selected rigs"""
+    bl_idname = "bikerig.live_wheel_spin"
+    bl_label = "Live Wheel Spin"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = get_rigs(context)
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig!")
+            return {'CANCELLED'}
+
+        for arm_obj in rigs:
+            live_wheel_spin(arm_obj)
+
+        self.report({'INFO'}, f"Wheel spin drivers restored on {len(rigs)} rigs")
+        return {'FINISHED'}
+
+
+class BikeRig_OT_BakeSteering(bpy.types.Operator):
+    """Bake the steering of the selected rigs from their path over the scene range"""
+    bl_idname = "bikerig.bake_steering"
+    bl_label = "Bake Steering"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = get_rigs(context)
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig!")
+            return {'CANCELLED'}
+
+        tolerance = context.scene.bikerig_props.bake_tolerance
+        frames = get_frames(context.scene)
+        angles = get_steer_angles(context, rigs, frames)
+        stats = [decimate_fcurves(r, bake_steering(r, frames, angles), tolerance) for r in rigs]
+
+        self.report({'INFO'}, f"Steering baked on {len(rigs)} rigs, {decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+class BikeRig_OT_BakeLean(bpy.types.Operator):
+    """Bake the lean into turns of the selected rigs from their speed and path over the scene range"""
+    bl_idname = "bikerig.bake_lean"
+    bl_label = "Bake Lean"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = get_rigs(context)
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig!")
+            return {'CANCELLED'}
+
+        rigs, skipped = euler_rigs(rigs, FRAME_BONE)
+        if not rigs:
+            self.report({'ERROR'}, "Set the frame bone's rotation mode to Euler (XYZ)!")
+            return {'CANCELLED'}
+
+        props = context.scene.bikerig_props
+        frames = get_frames(context.scene)
+        angles = get_lean_angles(context, rigs, frames, props.lean_smoothing, props.lean_offset)
+        stats = [decimate_fcurves(r, bake_lean(r, frames, angles), props.bake_tolerance) for r in rigs]
+
+        peak = max(np.degrees(np.abs(a)).max() for a in angles.values())
+        self.report({'WARNING'} if skipped else {'INFO'},
+                    f"Lean baked on {len(rigs)} rigs ({skipped} with a non Euler frame bone skipped), "
+                    f"up to {peak:.0f}°, {decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+class BikeRig_OT_BakeTerrain(bpy.types.Operator):
+    """Bake the height and pitch of the selected rigs so both wheels follow the ground collection over the scene range"""
+    bl_idname = "bikerig.bake_terrain"
+    bl_label = "Bake Terrain Contact"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = get_rigs(context)
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig!")
+            return {'CANCELLED'}
+        if not ground.get_colliders(context.scene):
+            self.report({'ERROR'}, "Set a ground collection with meshes!")
+            return {'CANCELLED'}
+        rigs, skipped = euler_rigs(rigs, "root")
+        if not rigs:
+            self.report({'ERROR'}, "Set the root bone's rotation mode to Euler (XYZ)!")
+            return {'CANCELLED'}
+
+        frames = get_frames(context.scene)
+        contacts = get_terrain_contacts(context, rigs, frames)
+        tolerance = context.scene.bikerig_props.bake_tolerance
+        stats = [decimate_fcurves(r, bake_terrain(r, frames, *contacts[r.name]), tolerance) for r in rigs if r.name in contacts]
+
+        missed = len(rigs) - len(contacts)
+        self.report({'WARNING'} if missed or skipped else {'INFO'},
+                    f"Terrain baked on {len(contacts)} rigs ({missed} off the ground, {skipped} with a non Euler root skipped), "
+                    f"{decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+class BikeRig_OT_BakeSuspension(bpy.types.Operator):
+    """Simulate the fork and rear shock of the selected rigs over the scene range and bake the travel and body motion"""
+    bl_idname = "bikerig.bake_suspension"
+    bl_label = "Bake Suspension"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = [r for r in get_rigs(context) if all(b in r.data.bones for b in SUSPENSION_BONES)]
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig with suspension bones (generate the rig again)!")
+            return {'CANCELLED'}
+        rigs, skipped = euler_rigs(rigs, "root")
+        if not rigs:
+            self.report({'ERROR'}, "Set the root bone's rotation mode to Euler (XYZ)!")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        frames = get_frames(scene)
+        suspension = get_suspension(context, rigs, frames)
+        stats = [decimate_fcurves(r, bake_suspension(r, frames, *suspension[r.name]), scene.bikerig_props.bake_tolerance)
+                 for r in rigs]
+
+        peak = max(np.abs(travel).max() for _, _, travel in suspension.values()) * scene.unit_settings.scale_length
+        self.report({'WARNING'} if skipped else {'INFO'},
+                    f"Suspension baked on {len(rigs)} rigs ({skipped} with a non Euler root skipped), "
+                    f"up to {peak * 1000:.0f} mm travel, {decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+@bpy.app.handlers.persistent
+def clear_caches(*args):
+    _distance_cache.clear()
+
+
+classes = [BikeRig_OT_BakeWheelSpin, BikeRig_OT_LiveWheelSpin, BikeRig_OT_BakeSteering, BikeRig_OT_BakeLean,
+           BikeRig_OT_BakeTerrain, BikeRig_OT_BakeSuspension]
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.app.handlers.load_post.append(clear_caches)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(clear_caches)
+    clear_caches()
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,122 @@
+"""Headless batch rigging driven by a JSON manifest.
+
+Runs in a single Blender session, e.g.
+
+    blender -b --python-expr "from bikerig import cli; cli.main()" -- manifest.json
+
+or with bpy as a module: ``from bikerig import cli; cli.run_manifest("manifest.json")``.
+
+The manifest lists the .blend files and, per file, the bikes to rig as role to
+object name mappings (the roles of BikeRig_Properties):
+
+    {
+        "files": [
+            {
+                "file": "bikes/city.blend",
+                "output": "bikes/city_rigged.blend",
+                "bikes": [
+                    {"frame": "Frame", "front_wheel": "Wheel.F", "back_wheel": "Wheel.B",
+                     "fork": "Fork", "handlebar": "Bars"}
+                ]
+            }
+        ]
+    }
+
+"output" is optional (the file is saved in place). "update_existing",
+"use_templates" and "share_data" (default false / true / false) set the
+matching build options.
+A file entry without "file" rigs the file that is already open. A manifest that is just a list is
+read as the "files" list. Relative paths are resolved against the manifest.
+"""
+
+import bpy
+import json
+import os
+import sys
+import time
+
+from . import core
+
+
+def load_manifest(path):
+    """Read a manifest and return its list of file jobs with absolute paths"""
+    with open(path) as f:
+        manifest = json.load(f)
+
+    jobs = manifest if isinstance(manifest, list) else manifest.get("files", [])
+    root = os.path.dirname(os.path.abspath(path))
+
+    for job in jobs:
+        for key in ("file", "output"):
+            if job.get(key):
+                job[key] = os.path.join(root, job[key])
+    return jobs
+
+
+def resolve_parts(bike):
+    """Turn a role -> object name mapping into a role -> object parts dict"""
+    parts = {}
+    for role in core.PART_NAMES:
+        name = bike.get(role)
+        obj = bpy.data.objects.get(name) if name else None
+        if name and not obj:
+            raise KeyError(f"object '{name}' for {role} not found")
+        parts[role] = obj
+    return parts
+
+
+def rig_file(job):
+    """Open (if needed), rig and save one file job. Returns the number of rigs built"""
+    if job.get("file"):
+        bpy.ops.wm.open_mainfile(filepath=job["file"], load_ui=False)
+        # The add-on's load_post handler isn't registered when run headless
+        core.clear_templates()
+
+    # Resolve every bike before the build renames the parts
+    bikes = []
+    for bike in job.get("bikes", []):
+        parts = resolve_parts(bike)
+        error = core.validate_parts(parts)
+        if error:
+            raise ValueError(error)
+        bikes.append((parts, None))
+
+    arm_objs, timings, overhead = core.build_rigs(
+        bpy.context, bikes, job.get("update_existing", False), job.get("use_templates", True),
+        job.get("share_data", False))
+
+    output = job.get("output") or job.get("file") or bpy.data.filepath
+    if not output:
+        raise ValueError("no file to save to, set 'output'")
+    bpy.ops.wm.save_as_mainfile(filepath=output)
+
+    print(f"BikeRig: {len(arm_objs)} bikes rigged in {sum(timings) + overhead:.2f} s -> {output}")
+    return len(arm_objs)
+
+
+def run_manifest(path):
+    """Rig every file of a manifest in sequence. Returns the number of failed files"""
+    failed = 0
+    start = time.perf_counter()
+
+    for job in load_manifest(path):
+        try:
+            rig_file(job)
+        except Exception as e:
+            failed += 1
+            print(f"BikeRig: failed to rig {job.get('file') or bpy.data.filepath}: {e}")
+
+    print(f"BikeRig: manifest done in {time.perf_counter() - start:.2f} s, {failed} failed")
+    return failed
+
+
+def main(argv=None):
+    """Command line entry point, arguments come after Blender's '--'"""
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if not argv:
+        print("usage: blender -b --python-expr \"from bikerig import cli; cli.main()\" -- manifest.json [...]")
+        sys.exit(2)
+
+    failed = sum(run_manifest(path) for path in argv)
+    sys.exit(1 if failed else 0)
@@ -1,6 +1,711 @@
 import bpy
+import re
 import math
+import time
+import functools
 import mathutils
+from contextlib import contextmanager
+
+from . import analysis
+
+# Role (BikeRig_Properties attribute) -> LC style tag name
+PART_NAMES = {
+    "frame": "BikeRig_Frame",
+    "front_wheel": "BikeRig_FWheel",
+    "back_wheel": "BikeRig_BWheel",
+    "fork": "BikeRig_Fork",
+    "handlebar": "BikeRig_Handlebar",
+    "suspension_f": "BikeRig_FSuspension",
+    "suspension_b": "BikeRig_BSuspension",
+}
+
+# Role -> bone the part object is parented to
+PART_BONES = {
+    "frame": "frame",
+    "back_wheel": "b_wheel",
+    "front_wheel": "f_wheel", # Spins
+    "fork": "def_fork", # Steers
+    "handlebar": "def_handle", # Steers
+    "suspension_f": "f_susp", # Slides with the front wheel
+    "suspension_b": "b_susp", # Moves with the rear wheel
+}
+
+# Role -> lowercase name fragments used to find parts by name.
+# Roles are in priority order: wheels come before the frame so that
+# "BikeRig_FWheel" isn't a frame, suspension before the fork for "fork_slider".
+PART_TAGS = {
+    "suspension_f": ("fsuspension", "suspension_f", "slider", "fork_lower"),
+    "suspension_b": ("bsuspension", "suspension_b", "shock", "swingarm"),
+    "front_wheel": ("fwheel", "front_wheel", "wheel_f", "wheel.f"),
+    "back_wheel": ("bwheel", "back_wheel", "rear_wheel", "wheel_b", "wheel.b", "wheel_r", "wheel.r"),
+    "fork": ("fork",),
+    "handlebar": ("handlebar", "handle"),
+    "frame": ("frame", "body"),
+}
+
+# Every bone the rig owns. Other bones found on a rig are never touched.
+RIG_BONES = ("root", "frame", "steer", "f_susp", "b_susp", "f_wheel", "b_wheel", "def_fork", "def_handle")
+
+# Wheel bones lie along the axle, so they spin around their Y axis
+SPIN_AXIS = 1
+
+# Custom properties that belong to one bike's animation, not to its model
+# (bikerig_path is the ID property behind Object.bikerig_path)
+INSTANCE_PROPS = ("bikerig_path", "bikerig_top_speed", "bikerig_arrival", "bikerig_speed")
+
+# Distance under which a bone or matrix is considered unchanged
+EPSILON = 1e-5
+
+# Bike model key -> (template rig object name, normalized frame matrix it was built for)
+_templates = {}
+
+# State of the interactive fleet build, read by the panel
+build_progress = {"running": False, "cancel": False, "done": 0, "total": 0, "eta": 0.0}
+
+# Seconds of rigging per step of the interactive fleet build
+TIME_SLICE = 0.25
+
+COLLECTION_NAME = "BikeRig_Collection"
+ARMATURE_NAME = "BikeRig_Armature"
+ARMATURE_DATA_NAME = "BikeRig_Armature_Data"
+
+
+def get_parts(props):
+    """Read the part pointers of a BikeRig_Properties group into a role dict"""
+    return {role: getattr(props, role) for role in PART_NAMES}
+
+
+def validate_parts(parts):
+    """Return an error message if the parts can't be rigged, else None"""
+    if not (parts.get("frame") and parts.get("front_wheel") and parts.get("back_wheel")):
+        return "Frame, Front Wheel, and Back Wheel are required!"
+    return None
+
+
+def get_tag_rules(context):
+    """PART_TAGS plus the custom tags of the add-on preferences, as hashable (role, tags) pairs"""
+    rules = {role: list(tags) for role, tags in PART_TAGS.items()}
+
+    addon = context.preferences.addons.get(__package__)
+    prefs = addon.preferences if addon else None
+    if prefs and prefs.use_custom_tags:
+        for role in rules:
+            custom = getattr(prefs, "tags_" + role)
+            rules[role].extend(tag.strip().lower() for tag in custom.split(",") if tag.strip())
+
+    return tuple((role, tuple(tags)) for role, tags in rules.items())
+
+
+@functools.lru_cache(maxsize=8)
+def compile_tags(rules):
+    """Compile all tag rules into one regex with a named group per role"""
+    groups = []
+    for role, tags in rules:
+        if tags:
+            # Longest first, so "front_wheel" wins over a shorter tag inside it
+            alternatives = "|".join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True))
+            groups.append(f"(?P<{role}>{alternatives})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+def get_owner_collections():
+    """Name of the first collection of every object, from one pass over all collections.
+
+    Object.users_collection scans every collection for each object it is
+    asked about, this map answers all of them at once.
+    """
+    owners = {}
+    for coll in bpy.data.collections:
+        for obj in coll.objects:
+            owners.setdefault(obj.name, coll.name)
+    for scene in bpy.data.scenes:
+        for obj in scene.collection.objects:
+            owners.setdefault(obj.name, scene.collection.name)
+    return owners
+
+
+def discover_bikes(objects, rules=tuple(PART_TAGS.items()), by_collection=True):
+    """Find tagged parts in a single pass over objects.
+
+    Every name is matched once against the compiled rules, the highest
+    priority role found in it wins. Parts are grouped into bikes by the
+    collection they are in (or all into one bike). Returns {bike name: parts}.
+    """
+    matcher = compile_tags(rules)
+    priority = {role: i for i, (role, tags) in enumerate(rules)}
+    owners = get_owner_collections() if by_collection else {}
+    bikes = {}
+
+    for obj in objects:
+        if obj.type == 'ARMATURE':
+            continue
+        roles = [m.lastgroup for m in matcher.finditer(obj.name)]
+        if not roles:
+            continue
+        role = min(roles, key=priority.get)
+
+        key = owners.get(obj.name, "")
+        parts = bikes.get(key)
+        if parts is None:
+            parts = bikes[key] = {r: None for r in PART_NAMES}
+        if not parts[role]:
+            parts[role] = obj
+
+    return bikes
+
+
+def find_parts(objects, rules=tuple(PART_TAGS.items())):
+    """Assign roles to the objects of one bike group by their names"""
+    bikes = discover_bikes(objects, rules, by_collection=False)
+    return bikes.get("") or {role: None for role in PART_NAMES}
+
+
+def get_bike_groups(collection):
+    """Every child collection is one bike, a collection without children is a single bike"""
+    return list(collection.children) or [collection]
+
+
+def get_rig_collection(scene):
+    """Find or create the collection every rig and part is moved into"""
+    if COLLECTION_NAME in bpy.data.collections:
+        return bpy.data.collections[COLLECTION_NAME]
+    main_coll = bpy.data.collections.new(COLLECTION_NAME)
+    scene.collection.children.link(main_coll)
+    return main_coll
+
+
+def move_to_coll(obj, coll):
+    if not obj: return
+    # Unlink from all, link to main
+    for c in obj.users_collection:
+        if c != coll:
+            c.objects.unlink(obj)
+    if obj.name not in coll.objects:
+        coll.objects.link(obj)
+
+
+def new_armature_object(coll):
+    """Create the rig datablock and object directly through bpy.data (no bpy.ops)"""
+    arm_data = bpy.data.armatures.new(ARMATURE_DATA_NAME)
+    arm_data.display_type = 'STICK'
+    arm_data.show_axes = True
+
+    arm_obj = bpy.data.objects.new(ARMATURE_NAME, arm_data)
+    coll.objects.link(arm_obj)
+    return arm_obj
+
+
+@contextmanager
+def edit_mode(context, arm_objs):
+    """Put all given armatures into a single (multi-object) edit mode session.
+
+    Edit bones only exist in edit mode, so this is the one mode switch the
+    build needs. It only relies on the view layer, so it also works headless.
+    """
+    view_layer = context.view_layer
+    prev_active = view_layer.objects.active
+    prev_selected = [o for o in view_layer.objects if o.select_get()]
+
+    if prev_active and prev_active.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    for o in prev_selected:
+        o.select_set(False)
+    for o in arm_objs:
+        o.select_set(True)
+    view_layer.objects.active = arm_objs[0]
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    try:
+        yield
+    finally:
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        for o in arm_objs:
+            o.select_set(False)
+        for o in prev_selected:
+            if o.name in view_layer.objects:
+                o.select_set(True)
+        view_layer.objects.active = prev_active
+
+
+def tag_redraw(context):
+    if not context.screen:
+        return
+    for area in context.screen.areas:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+
+def get_bone_layout(rests, fits, space=None):
+    """Return the rest layout as an ordered {bone: (head, tail, parent)} dict.
+
+    rests maps each role to the part's rest world matrix (see get_rest_matrices),
+    fits the wheel and fork roles to their analysis (see analysis.analyze_parts),
+    space optionally converts world positions into armature space.
+    Parents always come before their children.
+    """
+    space = space or mathutils.Matrix.Identity(4)
+    up = mathutils.Vector((0, 0, 0.2))
+    axle = mathutils.Vector((0.2, 0, 0)) # X-axis tail
+
+    def loc(role):
+        return space @ rests[role].translation
+
+    def wheel_bone(role):
+        # Pivot at the fitted axle center, tail along the axle
+        center, axis, radius = fits[role]
+        head = space @ center
+        return head, head + (space.to_3x3() @ axis).normalized() * axle.length
+
+    layout = {}
+
+    # --- A. Root ---
+    layout["root"] = (mathutils.Vector((0, 0, 0)), mathutils.Vector((0, 0, 1)), None)
+
+    # --- B. Body/Frame ---
+    # Pivot at Frame Origin, tail should allow reasonable selection
+    head = loc("frame")
+    layout["frame"] = (head, head + mathutils.Vector((0, 0, 0.5)), "root")
+
+    # --- C. Steering System ---
+    # The Steering Axis is CRITICAL.
+    # It is inferred from the fork mesh (head tube axis, with rake) and the
+    # bone pivots where it passes closest to the Fork's origin.
+    # Without a fork: vertical axis at the Frame origin.
+    if "fork" in fits:
+        point, axis = fits["fork"]
+        origin = rests["fork"].translation
+        head = point + axis * (origin - point).dot(axis)
+    else:
+        head, axis = rests["frame"].translation, mathutils.Vector((0, 0, 1))
+    # The bone's Y axis is the steering axis
+    head = space @ head
+    layout["steer"] = (head, head + (space.to_3x3() @ axis).normalized() * 0.4, "frame")
+
+    # --- D. Suspension ---
+    # Pivots at the axles, travel along the bone's Y: the steering axis at
+    # the front (fork slider), vertical at the back (rear shock)
+    front_axle = space @ fits["front_wheel"][0]
+    rear_axle = space @ fits["back_wheel"][0]
+    layout["f_susp"] = (front_axle, front_axle + (space.to_3x3() @ axis).normalized() * up.length, "steer")
+    layout["b_susp"] = (rear_axle, rear_axle + up, "frame")
+
+    # --- E. Wheels ---
+    # Each wheel hangs from its suspension: front steers, back follows the Frame
+    layout["f_wheel"] = (*wheel_bone("front_wheel"), "f_susp")
+    layout["b_wheel"] = (*wheel_bone("back_wheel"), "b_susp")
+
+    # --- F. Components ---
+    if "fork" in rests:
+        head = loc("fork")
+        layout["def_fork"] = (head, head + up, "steer")
+    if "handlebar" in rests:
+        head = loc("handlebar")
+        layout["def_handle"] = (head, head + up, "steer")
+
+    return layout
+
+
+def is_close(a, b):
+    """Compare two vectors or matrices within EPSILON"""
+    if isinstance(a, mathutils.Matrix):
+        return all(is_close(ra, rb) for ra, rb in zip(a, b))
+    return (a - b).length < EPSILON
+
+
+def layout_changed(arm_data, layout):
+    """Check the rest bones (object mode) against a layout without entering edit mode"""
+    bones = arm_data.bones
+    for name in RIG_BONES:
+        if (name in bones) != (name in layout):
+            return True
+
+    for name, (head, tail, parent) in layout.items():
+        bone = bones[name]
+        if not (is_close(bone.head_local, head) and is_close(bone.tail_local, tail)):
+            return True
+        if (bone.parent.name if bone.parent else None) != parent:
+            return True
+    return False
+
+
+def sync_bones(arm_data, layout):
+    """Make the edit bones match the layout, only touching what differs (must be in edit mode).
+
+    A fresh armature simply gets all bones created. Bones that aren't ours are left alone.
+    """
+    edit_bones = arm_data.edit_bones
+    for name in RIG_BONES:
+        if name in edit_bones and name not in layout:
+            edit_bones.remove(edit_bones[name])
+
+    for name, (head, tail, parent) in layout.items():
+        bone = edit_bones.get(name)
+        if not bone:
+            bone = edit_bones.new(name)
+        if not is_close(bone.head, head):
+            bone.head = head
+        if not is_close(bone.tail, tail):
+            bone.tail = tail
+
+        parent_bone = edit_bones[parent] if parent else None
+        if bone.parent != parent_bone:
+            bone.parent = parent_bone
+
+
+def bone_rest_matrix(arm_obj, bone_name):
+    """World matrix a child parented to the bone gets in rest pose (at the bone tail)"""
+    bone = arm_obj.data.bones[bone_name]
+    return arm_obj.matrix_world @ bone.matrix_local @ mathutils.Matrix.Translation((0, bone.length, 0))
+
+
+def get_rest_matrix(obj):
+    """World matrix of a part in its rig's rest pose, computed without the depsgraph"""
+    parent = obj.parent
+    if parent and obj.parent_type == 'BONE' and parent.type == 'ARMATURE' and obj.parent_bone in parent.data.bones:
+        return bone_rest_matrix(parent, obj.parent_bone) @ obj.matrix_parent_inverse @ obj.matrix_basis
+    return obj.matrix_world.copy()
+
+
+def get_rest_matrices(parts):
+    return {role: get_rest_matrix(obj) for role, obj in parts.items() if obj}
+
+
+def parent_to_bone(obj, arm_obj, bone_name, rest):
+    """Parent a part to a bone, keeping it at its rest world matrix"""
+    inverse = bone_rest_matrix(arm_obj, bone_name).inverted() @ rest @ obj.matrix_basis.inverted()
+
+    if obj.parent != arm_obj or obj.parent_type != 'BONE' or obj.parent_bone != bone_name:
+        obj.parent = arm_obj
+        obj.parent_type = 'BONE'
+        obj.parent_bone = bone_name
+    if not is_close(obj.matrix_parent_inverse, inverse):
+        obj.matrix_parent_inverse = inverse
+
+
+def get_driver(arm_obj, bone_name, index=SPIN_AXIS):
+    if not arm_obj.animation_data:
+        return None
+    return arm_obj.animation_data.drivers.find(f'pose.bones["{bone_name}"].rotation_euler', index=index)
+
+
+def get_wheel_radius(arm_obj, bone_name):
+    """Rolling radius of a wheel bone, read back from its spin driver"""
+    fcurve = get_driver(arm_obj, bone_name)
+    match = re.search(r"/\s*([0-9.eE+-]+)", fcurve.driver.expression) if fcurve else None
+    return float(match.group(1)) if match else 0.3
+
+
+def get_travel_axis(arm_obj):
+    """Armature axis (driver transform type) and sign the bike rolls forward along, rear to front wheel"""
+    bones = arm_obj.data.bones
+    forward = bones["f_wheel"].head_local - bones["b_wheel"].head_local
+    if abs(forward.x) > abs(forward.y):
+        return 'LOC_X', forward.x > 0
+    return 'LOC_Y', forward.y >= 0
+
+
+def add_wheel_driver(arm_obj, bone_name, radius):
+    """Add the wheel spin driver, or only update its target and radius if it already exists.
+
+    dist is the root's position along the bike's forward axis in armature
+    space; the axles point to the right of the bike, so rolling forward
+    turns the wheels negative about them.
+    """
+    transform_type, ahead = get_travel_axis(arm_obj)
+    expression = f"{'-' if ahead else ''}dist / {radius:.4f}"
+
+    fcurve = get_driver(arm_obj, bone_name)
+    if fcurve:
+        d = fcurve.driver
+    else:
+        # Rigs built before the spin moved to the axle axis have it on X
+        legacy = get_driver(arm_obj, bone_name, 0)
+        if legacy:
+            arm_obj.animation_data.drivers.remove(legacy)
+
+        pbone = arm_obj.pose.bones.get(bone_name)
+        pbone.rotation_mode = 'XYZ'
+        d = pbone.driver_add("rotation_euler", SPIN_AXIS).driver
+        d.type = 'SCRIPTED'
+        var = d.variables.new()
+        var.name = "dist"
+        var.type = 'TRANSFORMS'
+
+    target = d.variables["dist"].targets[0]
+    if target.id != arm_obj:
+        target.id = arm_obj
+    if target.bone_target != "root":
+        target.bone_target = "root"
+    if target.transform_type != transform_type:
+        target.transform_type = transform_type
+    if target.transform_space != 'TRANSFORM_SPACE':
+        target.transform_space = 'TRANSFORM_SPACE'
+    if d.expression != expression:
+        d.expression = expression
+
+
+def lock_steer(arm_obj):
+    # Lock Steer Loc/Scale/Rot(X,Z) -> Only Y (the bone along the head tube) allowed
+    pb_steer = arm_obj.pose.bones.get("steer")
+    if pb_steer:
+        pb_steer.rotation_mode = 'XYZ'
+        pb_steer.lock_location = (True, True, True)
+        pb_steer.lock_rotation = (True, False, True) # Allow Y steer
+        pb_steer.lock_scale = (True, True, True)
+
+
+def set_euler_bones(arm_obj):
+    # The bakes key root and frame rotation as Euler angles, new bones default to quaternions
+    for name in ("root", "frame"):
+        pbone = arm_obj.pose.bones.get(name)
+        if pbone:
+            pbone.rotation_mode = 'XYZ'
+
+
+def lock_suspension(arm_obj):
+    # Lock everything but Loc Y -> the suspension only slides along its travel
+    for name in ("f_susp", "b_susp"):
+        pbone = arm_obj.pose.bones.get(name)
+        if pbone:
+            pbone.lock_location = (True, False, True)
+            pbone.lock_rotation = (True, True, True)
+            pbone.lock_scale = (True, True, True)
+
+
+def store_steering_geometry(arm_obj, fits):
+    """Keep rake, trail and fork offset on the rig for display and the solvers"""
+    if "fork" not in fits:
+        return
+    rake, trail, offset = analysis.get_steering_geometry(fits)
+    arm_obj["bikerig_rake"] = rake
+    arm_obj["bikerig_trail"] = trail
+    arm_obj["bikerig_fork_offset"] = offset
+
+
+def get_model_key(rests, fits):
+    """Hashable description of a bike model: its bone layout relative to the frame"""
+    layout = get_bone_layout(rests, fits, rests["frame"].normalized().inverted())
+    key = []
+    for name, (head, tail, parent) in layout.items():
+        if name == "root":
+            continue
+        key.append((name, parent) + tuple(round(v, 4) for v in (*head, *tail)))
+    return tuple(key)
+
+
+def get_template(key):
+    """Return (template rig object, frame matrix) for a model key if the template still exists"""
+    if key not in _templates:
+        return None
+    name, frame_matrix = _templates[key]
+    template = bpy.data.objects.get(name)
+    if not template or template.type != 'ARMATURE' or "root" not in template.data.bones:
+        del _templates[key]
+        return None
+    return template, frame_matrix
+
+
+def forget_template(arm_obj):
+    """Drop the cache entries of a rig whose bones are about to change, it no longer matches its model key"""
+    for key, (name, frame_matrix) in list(_templates.items()):
+        if name == arm_obj.name:
+            del _templates[key]
+
+
+def copy_rig(template, coll, matrix, share_data=False):
+    """Instance a finished rig: copy object, bones and drivers and point the drivers at the copy.
+
+    With share_data the copy uses the template's armature datablock, only the
+    object (pose, drivers and their wheel radius) is its own.
+    """
+    arm_obj = template.copy()
+    if not share_data:
+        arm_obj.data = template.data.copy()
+    arm_obj.matrix_world = matrix
+    coll.objects.link(arm_obj)
+
+    # Start from a clean rest pose, never share the template's animation:
+    # no keys, no path or speed of its own, spin drivers live (not baked)
+    for prop in INSTANCE_PROPS:
+        if prop in arm_obj:
+            del arm_obj[prop]
+    if arm_obj.animation_data:
+        arm_obj.animation_data.action = None
+        for fcurve in arm_obj.animation_data.drivers:
+            fcurve.mute = False
+            for var in fcurve.driver.variables:
+                for target in var.targets:
+                    if target.id == template:
+                        target.id = arm_obj
+    for pbone in arm_obj.pose.bones:
+        pbone.location = (0, 0, 0)
+        pbone.rotation_quaternion = (1, 0, 0, 0)
+        pbone.rotation_euler = (0, 0, 0)
+        pbone.scale = (1, 1, 1)
+
+    return arm_obj
+
+
+@bpy.app.handlers.persistent
+def clear_templates(*args):
+    _templates.clear()
+
+
+@bpy.app.handlers.persistent
+def reset_build_progress(*args):
+    """A fleet build can't survive loading a file, don't let it block the next one"""
+    build_progress.update(running=False, cancel=False, done=0, total=0, eta=0.0)
+
+
+def find_rig(parts):
+    """Return the BikeRig armature the parts are already parented to, if any"""
+    for obj in parts.values():
+        parent = obj.parent if obj else None
+        if parent and parent.type == 'ARMATURE' and "root" in parent.data.bones:
+            return parent
+    return None
+
+
+def collect_parts(parts, coll, arm_obj=None):
+    """Tag (LC Style) and move into coll the parts that aren't part of arm_obj yet"""
+    for role, name in PART_NAMES.items():
+        obj = parts.get(role)
+        if not obj or (arm_obj and obj.parent == arm_obj):
+            continue
+        obj.name = name
+        move_to_coll(obj, coll)
+
+
+def prepare_rig(scene, parts, coll=None):
+    """Tag and collect the parts and create an empty rig object for them"""
+    main_coll = coll or get_rig_collection(scene)
+    collect_parts(parts, main_coll)
+    return new_armature_object(main_coll)
+
+
+def finish_rig(arm_obj, parts, rests, fits):
+    """Parent the parts, add the wheel drivers and lock the controls (object mode)"""
+    # Skinning (Parenting Objects to Bones)
+    for role, bone_name in PART_BONES.items():
+        if parts.get(role):
+            parent_to_bone(parts[role], arm_obj, bone_name, rests[role])
+
+    # Auto-Rotation Drivers
+    add_wheel_driver(arm_obj, "f_wheel", fits["front_wheel"][2])
+    add_wheel_driver(arm_obj, "b_wheel", fits["back_wheel"][2])
+
+    # Optimization (Lock axes)
+    lock_steer(arm_obj)
+    set_euler_bones(arm_obj)
+    lock_suspension(arm_obj)
+    store_steering_geometry(arm_obj, fits)
+
+
+def build_rigs(context, bikes, update_existing=False, use_templates=False, share_data=False):
+    """Build rigs for many bikes sharing a single edit mode session.
+
+    bikes is a list of (parts, collection) pairs, collection may be None.
+    With update_existing, bikes that already have a rig get it updated in
+    place: only bones, parenting and drivers that differ are touched and rigs
+    whose bones are unchanged never enter edit mode.
+    With use_templates, the first rig built for a bike model is remembered and
+    further bikes of the same model get a copy of it, moved into place, which
+    needs neither edit mode nor new drivers. With share_data those copies
+    also share the template's armature datablock. A shared rig that needs
+    different bones is given its own datablock first.
+    Returns the rig objects, the per bike build times in seconds and the
+    shared overhead (mode switching) that isn't attributed to any bike.
+    """
+    start = time.perf_counter()
+    timings = [0.0] * len(bikes)
+    arm_objs = [None] * len(bikes)
+    rests = [get_rest_matrices(parts) for parts, coll in bikes]
+    # Mesh analysis is cached, so unchanged parts cost a vertex read only
+    fits = [analysis.analyze_parts(parts, rest) for (parts, coll), rest in zip(bikes, rests)]
+    keys = [None] * len(bikes)
+
+    def build_pass(indices):
+        """Build the given bikes, returns the ones that wait for a template of this batch"""
+        layouts = {}
+        edit = []
+        deferred = []
+        pending = set()
+
+        # 1. Find, copy or create the rig objects and work out their layout
+        for i in indices:
+            t = time.perf_counter()
+            parts, coll = bikes[i]
+            rest = rests[i]
+
+            arm_obj = find_rig(parts) if update_existing else None
+            key = get_model_key(rest, fits[i]) if use_templates and not arm_obj else None
+            template = get_template(key) if key else None
+
+            if arm_obj:
+                collect_parts(parts, arm_obj.users_collection[0], arm_obj)
+            elif template:
+                template_obj, frame_matrix = template
+                main_coll = coll or get_rig_collection(context.scene)
+                collect_parts(parts, main_coll)
+                matrix = rest["frame"].normalized() @ frame_matrix.inverted() @ template_obj.matrix_world
+                arm_obj = copy_rig(template_obj, main_coll, matrix, share_data)
+            elif key in pending:
+                # Same model as a bike built in this pass, copy it once that's done
+                deferred.append(i)
+                timings[i] += time.perf_counter() - t
+                continue
+            else:
+                arm_obj = prepare_rig(context.scene, parts, coll)
+                if key:
+                    keys[i] = key
+                    pending.add(key)
+
+            layouts[i] = get_bone_layout(rest, fits[i], arm_obj.matrix_world.inverted())
+            if template and share_data:
+                # The model key already matched, don't split the shared bones over rounding noise
+                pass
+            elif layout_changed(arm_obj.data, layouts[i]):
+                if arm_obj.data.users > 1:
+                    arm_obj.data = arm_obj.data.copy()
+                forget_template(arm_obj)
+                edit.append(i)
+
+            arm_objs[i] = arm_obj
+            timings[i] += time.perf_counter() - t
+
+        # 2. All bone changes in one edit mode session
+        if edit:
+            with edit_mode(context, [arm_objs[i] for i in edit]):
+                for i in edit:
+                    t = time.perf_counter()
+                    sync_bones(arm_objs[i].data, layouts[i])
+                    timings[i] += time.perf_counter() - t
+
+        # 3. Parenting, drivers and locks
+        for i in layouts:
+            t = time.perf_counter()
+            finish_rig(arm_objs[i], bikes[i][0], rests[i], fits[i])
+            if keys[i]:
+                _templates.setdefault(keys[i], (arm_objs[i].name, rests[i]["frame"].normalized()))
+            timings[i] += time.perf_counter() - t
+
+        return deferred
+
+    deferred = build_pass(range(len(bikes)))
+    if deferred:
+        build_pass(deferred)
+
+    overhead = time.perf_counter() - start - sum(timings)
+    return arm_objs, timings, overhead
+
+
+def build_rig(context, parts, update_existing=False, use_templates=False, share_data=False):
+    """Build (or update) a complete rig for one bike through data level API calls"""
+    arm_objs, _, _ = build_rigs(context, [(parts, None)], update_existing, use_templates, share_data)
+    return arm_objs[0]
+
 
 class BikeRig_OT_BuildRig(bpy.types.Operator):
     """Generate a complete rig from selected objects (Launch Control Style)"""
@@ -10,189 +715,285 @@ class BikeRig_OT_BuildRig(bpy.types.Operator):
 
     def execute(self, context):
         props = context.scene.bikerig_props
-        
+        parts = get_parts(props)
+
         # 1. Validation
-        if not (props.frame and props.front_wheel and props.back_wheel):
-            self.report({'ERROR'}, "Frame, Front Wheel, and Back Wheel are required!")
+        error = validate_parts(parts)
+        if error:
+            self.report({'ERROR'}, error)
             return {'CANCELLED'}
 
-        # 2. Renaming (LC Style Tagging)
-        mapping = {
-            props.frame: "BikeRig_Frame",
-            props.front_wheel: "BikeRig_FWheel",
-            props.back_wheel: "BikeRig_BWheel",
-            props.fork: "BikeRig_Fork",
-            props.handlebar: "BikeRig_Handlebar"
-        }
-        
-        # Store original references before renaming might confusing things (though pointers track well)
-        obj_frame = props.frame
-        obj_fwheel = props.front_wheel
-        obj_bwheel = props.back_wheel
-        obj_fork = props.fork
-        obj_handle = props.handlebar
-
-        for obj, name in mapping.items():
-            if obj:
-                obj.name = name
-
-        # 3. Organization (Collection)
-        coll_name = "BikeRig_Collection"
-        if coll_name in bpy.data.collections:
-            main_coll = bpy.data.collections[coll_name]
+        # 2. Build (renaming, collection, armature, bones, parenting, drivers)
+        existing = props.update_existing and find_rig(parts)
+        build_rig(context, parts, props.update_existing, props.use_templates, props.share_data)
+
+        if existing:
+            self.report({'INFO'}, "Rig Updated!")
         else:
-            main_coll = bpy.data.collections.new(coll_name)
-            context.scene.collection.children.link(main_coll)
-
-        def move_to_coll(obj):
-            if not obj: return
-            # Unlink from all, link to main
-            for c in obj.users_collection:
-                c.objects.unlink(obj)
-            main_coll.objects.link(obj)
-
-        for o in [obj_frame, obj_fwheel, obj_bwheel, obj_fork, obj_handle]:
-            move_to_coll(o)
-
-        # 4. Create Armature
-        bpy.ops.object.armature_add(enter_editmode=False, location=(0,0,0))
-        arm_obj = context.active_object
-        arm_obj.name = "BikeRig_Armature"
-        move_to_coll(arm_obj)
-        
-        arm_data = arm_obj.data
-        arm_data.name = "BikeRig_Armature_Data"
-        arm_data.display_type = 'STICK'
-        arm_data.show_axes = True
-        
-        # 5. Bone Placement & Hierarchy
-        bpy.ops.object.mode_set(mode='EDIT')
-        edit_bones = arm_data.edit_bones
-        
-        for b in edit_bones:
-            edit_bones.remove(b)
-
-        def create_bone(name, head_loc, tail_loc=None, parent_bone=None):
-            bone = edit_bones.new(name)
-            bone.head = head_loc
-            if tail_loc:
-                bone.tail = tail_loc
-            else:
-                # Default tail up
-                bone.tail = bone.head + mathutils.Vector((0, 0, 0.2))
-            
-            if parent_bone:
-                bone.parent = parent_bone
-            return bone
-
-        # --- A. Root ---
-        root = edit_bones.new("root")
-        root.head = (0,0,0)
-        root.tail = (0,0,1)
-
-        # --- B. Body/Frame ---
-        # Pivot at Frame Origin
-        bn_frame = create_bone("frame", obj_frame.matrix_world.translation, parent_bone=root)
-        # Tail should allow reasonable selection
-        bn_frame.tail = bn_frame.head + mathutils.Vector((0, 0, 0.5))
-
-        # --- C. Steering System ---
-        # The Steering Axis is CRITICAL.
-        # It should pivot at the Fork's origin.
-        # IMPORTANT: User must set Fork Origin to the steerer tube/headset.
-        
-        steer_origin = obj_fork.matrix_world.translation if obj_fork else obj_frame.matrix_world.translation
-        
-        # Create a dedicated "Steer" bone for animation (User control)
-        bn_steer = create_bone("steer", steer_origin, parent_bone=bn_frame)
-        # Orient Steer bone for Z-axis rotation (Standard Blender Rigging)
-        # We enforce verticality or align to fork? 
-        # Vertical is safer for simple rigs. Aligned is better for realism (Rake angle).
-        # Let's try to infer rake if possible, otherwise vertical.
-        # Simple mode: Vertical Z axis.
-        bn_steer.tail = bn_steer.head + mathutils.Vector((0, 0, 0.4))
-
-
-        # --- D. Wheels ---
-        # Front Wheel follows Steering
-        bn_fwheel = create_bone("f_wheel", obj_fwheel.matrix_world.translation, parent_bone=bn_steer)
-        # Align axle (Local X)
-        bn_fwheel.tail = bn_fwheel.head + mathutils.Vector((0.2, 0, 0)) # X-axis tail
-
-        # Back Wheel follows Frame
-        bn_bwheel = create_bone("b_wheel", obj_bwheel.matrix_world.translation, parent_bone=bn_frame)
-        bn_bwheel.tail = bn_bwheel.head + mathutils.Vector((0.2, 0, 0)) # X-axis tail
-
-        # --- E. Components ---
-        # Fork Mesh Bone (Constrained to Steer)
-        if obj_fork:
-            bn_fork_mesh = create_bone("def_fork", obj_fork.matrix_world.translation, parent_bone=bn_steer)
-
-        # Handlebar Mesh Bone (Constrained to Steer)
-        if obj_handle:
-            bn_handle_mesh = create_bone("def_handle", obj_handle.matrix_world.translation, parent_bone=bn_steer)
+            self.report({'INFO'}, "Launch Control Style Rig Created!")
+        return {'FINISHED'}
 
+class BikeRig_FleetSource:
+    """Shared by the fleet operators: where the bikes come from and how they are gathered"""
+    source: bpy.props.EnumProperty(
+        name="Source",
+        items=[
+            ('COLLECTION', "Fleet Collection", "Every child collection of the fleet collection is a bike"),
+            ('DISCOVERED', "Discovered Bikes", "The bikes found by Discover Bikes"),
+        ],
+        default='COLLECTION',
+    )
 
-        bpy.ops.object.mode_set(mode='OBJECT')
+    def gather(self, context):
+        """Return (bikes, names) for build_rigs, or None after reporting the error"""
+        if self.source == 'DISCOVERED':
+            return self.gather_discovered(context)
 
-        # 6. Skinning (Parenting Objects to Bones)
-        def parent_to_bone(obj, bone_name):
-            if not obj: return
-            obj.parent = arm_obj
-            obj.parent_type = 'BONE'
-            obj.parent_bone = bone_name
-            obj.matrix_parent_inverse = arm_obj.matrix_world.inverted()
-
-        parent_to_bone(obj_frame, "frame")
-        parent_to_bone(obj_bwheel, "b_wheel")
-        parent_to_bone(obj_fwheel, "f_wheel") # Spins
-        
-        if obj_fork:
-            parent_to_bone(obj_fork, "def_fork") # Steers
-        if obj_handle:
-            parent_to_bone(obj_handle, "def_handle") # Steers
-
-        # 7. Auto-Rotation Drivers
-        def add_wheel_driver(bone_name, wheel_obj):
-            if not wheel_obj: return
-            radius = wheel_obj.dimensions.z / 2.0
-            if radius <= 0.01: radius = 0.3
-            
-            pbone = arm_obj.pose.bones.get(bone_name)
-            pbone.rotation_mode = 'XYZ'
-            d = pbone.driver_add("rotation_euler", 0).driver # X axis
-            d.type = 'SCRIPTED'
-            
-            var = d.variables.new()
-            var.name = "dist"
-            var.type = 'TRANSFORMS'
-            var.targets[0].id = arm_obj
-            var.targets[0].bone_target = "root"
-            var.targets[0].transform_type = 'LOC_Y'
-            var.targets[0].transform_space = 'LOCAL_SPACE'
-            
-            d.expression = f"-dist / {radius:.4f}"
-
-        add_wheel_driver("f_wheel", obj_fwheel)
-        add_wheel_driver("b_wheel", obj_bwheel)
-
-        # 8. Optimization (Lock axes)
-        # Lock Steer Loc/Scale/Rot(X,Y) -> Only Z allowed
-        pb_steer = arm_obj.pose.bones.get("steer")
-        if pb_steer:
-            pb_steer.lock_location = (True, True, True)
-            pb_steer.lock_rotation = (True, True, False) # Allow Z steer
-            pb_steer.lock_scale = (True, True, True)
-
-        self.report({'INFO'}, "Launch Control Style Rig Created!")
+        fleet = context.scene.bikerig_props.fleet_collection
+        if not fleet:
+            self.report({'ERROR'}, "Pick a fleet collection first!")
+            return None
+
+        # Find the parts of every bike, skip incomplete groups
+        rules = get_tag_rules(context)
+        bikes = []
+        names = []
+        for coll in get_bike_groups(fleet):
+            parts = find_parts(coll.objects, rules)
+            if validate_parts(parts):
+                # Untagged vendor model, go by geometry
+                parts = analysis.detect_parts(coll.all_objects)
+            error = validate_parts(parts)
+            if error:
+                self.report({'WARNING'}, f"{coll.name}: {error}")
+                continue
+            bikes.append((parts, coll))
+            names.append(coll.name)
+
+        if not bikes:
+            self.report({'ERROR'}, "No complete bike found in the fleet collection!")
+            return None
+        return bikes, names
+
+    def gather_discovered(self, context):
+        bikes = []
+        names = []
+        for item in context.scene.bikerig_bikes:
+            parts = get_parts(item)
+            if validate_parts(parts):
+                continue
+            # Keep the rig next to its parts
+            bikes.append((parts, parts["frame"].users_collection[0]))
+            names.append(item.name)
+
+        if not bikes:
+            self.report({'ERROR'}, "No discovered bike, run Discover Bikes first!")
+            return None
+        return bikes, names
+
+    def report_timings(self, names, timings, overhead):
+        for name, t in zip(names, timings):
+            print(f"BikeRig: {name} rigged in {t * 1000:.1f} ms")
+        total = sum(timings) + overhead
+        print(f"BikeRig: shared overhead {overhead * 1000:.1f} ms")
+
+        self.report({'INFO'}, f"{len(timings)} bikes rigged in {total:.2f} s "
+                              f"({total / max(len(timings), 1) * 1000:.1f} ms per bike)")
+
+
+class BikeRig_OT_BuildFleet(BikeRig_FleetSource, bpy.types.Operator):
+    """Generate rigs for every bike group (child collection) of the fleet collection in one pass"""
+    bl_idname = "bikerig.build_fleet"
+    bl_label = "Build Fleet Rigs"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        gathered = self.gather(context)
+        if not gathered:
+            return {'CANCELLED'}
+        bikes, names = gathered
+
+        # Build all rigs at once
+        props = context.scene.bikerig_props
+        arm_objs, timings, overhead = build_rigs(context, bikes, props.update_existing, props.use_templates, props.share_data)
+
+        self.report_timings(names, timings, overhead)
+        return {'FINISHED'}
+
+
+class BikeRig_OT_BuildFleetModal(BikeRig_FleetSource, bpy.types.Operator):
+    """Generate the fleet rigs chunk by chunk with progress, Esc cancels after the current chunk"""
+    bl_idname = "bikerig.build_fleet_modal"
+    bl_label = "Build Fleet Rigs (Interactive)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if build_progress["running"]:
+            self.report({'ERROR'}, "A fleet build is already running!")
+            return {'CANCELLED'}
+
+        gathered = self.gather(context)
+        if not gathered:
+            return {'CANCELLED'}
+        self.bikes, self.names = gathered
+
+        self.done = 0
+        self.chunk = 1
+        self.timings = []
+        self.overhead = 0.0
+        self.start = time.perf_counter()
+        build_progress.update(running=True, cancel=False, done=0, total=len(self.bikes), eta=0.0)
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(self.bikes))
+        self.timer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' or build_progress["cancel"]:
+            return self.finish(context)
+        if event.type != 'TIMER' or event.timer != self.timer:
+            return {'PASS_THROUGH'}
+
+        # 1. One chunk: a complete build_rigs call, so every finished bike is consistent
+        props = context.scene.bikerig_props
+        chunk = self.bikes[self.done:self.done + self.chunk]
+        t = time.perf_counter()
+        try:
+            arm_objs, timings, overhead = build_rigs(context, chunk, props.update_existing, props.use_templates, props.share_data)
+        except Exception as e:
+            self.report({'ERROR'}, f"Fleet build stopped after {self.done} bikes: {e}")
+            self.cleanup(context)
+            return {'CANCELLED'}
+        elapsed = time.perf_counter() - t
+
+        self.timings.extend(timings)
+        self.overhead += overhead
+        self.done += len(chunk)
+
+        # 2. Size the next chunk to fill the time slice, fewer chunks = less UI overhead
+        self.chunk = max(1, int(TIME_SLICE * len(chunk) / max(elapsed, 1e-6)))
+
+        # 3. Progress and ETA for the panel
+        spent = time.perf_counter() - self.start
+        build_progress.update(done=self.done, eta=spent / self.done * (len(self.bikes) - self.done))
+        context.window_manager.progress_update(self.done)
+        tag_redraw(context)
+
+        if self.done >= len(self.bikes):
+            return self.finish(context)
+        return {'RUNNING_MODAL'}
+
+    def cleanup(self, context):
+        """Remove the timer and end the progress, however the build ends"""
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        build_progress.update(running=False, cancel=False)
+        tag_redraw(context)
+
+    def cancel(self, context):
+        # Blender ended the modal (file load, window closed)
+        self.cleanup(context)
+
+    def finish(self, context):
+        self.cleanup(context)
+
+        if self.done < len(self.bikes):
+            self.report({'WARNING'}, f"Cancelled, {self.done} of {len(self.bikes)} bikes rigged")
+        else:
+            self.report_timings(self.names, self.timings, self.overhead)
+        # Keep the rigs that are done (and their undo step) either way
+        return {'FINISHED'}
+
+
+class BikeRig_OT_CancelBuild(bpy.types.Operator):
+    """Stop the running fleet build after the current chunk"""
+    bl_idname = "bikerig.cancel_build"
+    bl_label = "Cancel Fleet Build"
+
+    def execute(self, context):
+        build_progress["cancel"] = True
+        return {'FINISHED'}
+
+
+class BikeRig_OT_DetectParts(bpy.types.Operator):
+    """Fill in the components by analysing the geometry of the bike collection"""
+    bl_idname = "bikerig.detect_parts"
+    bl_label = "Detect Components"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        props = context.scene.bikerig_props
+        if not props.source_collection:
+            self.report({'ERROR'}, "Pick the bike's collection first!")
+            return {'CANCELLED'}
+
+        parts = analysis.detect_parts(props.source_collection.all_objects)
+        found = [role for role, obj in parts.items() if obj]
+        # Roles not found are cleared, so no part of the previous bike is left over
+        for role in PART_NAMES:
+            setattr(props, role, parts.get(role))
+
+        error = validate_parts(parts)
+        if error:
+            self.report({'WARNING'}, f"Only found {len(found)} components. {error}")
+        else:
+            self.report({'INFO'}, f"Found {len(found)} components")
+        return {'FINISHED'}
+
+class BikeRig_OT_DiscoverBikes(bpy.types.Operator):
+    """Find the tagged parts of every bike in the scene in one pass"""
+    bl_idname = "bikerig.discover_bikes"
+    bl_label = "Discover Bikes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        start = time.perf_counter()
+        bikes = discover_bikes(scene.objects, get_tag_rules(context))
+
+        # One BikeRig_Properties entry per complete bike
+        scene.bikerig_bikes.clear()
+        for name, parts in bikes.items():
+            if validate_parts(parts):
+                continue
+            item = scene.bikerig_bikes.add()
+            item.name = name
+            for role, obj in parts.items():
+                setattr(item, role, obj)
+
+        if not scene.bikerig_bikes:
+            self.report({'WARNING'}, "No tagged bike found")
+            return {'FINISHED'}
+
+        # The first bike is ready for the single bike builder
+        for role in PART_NAMES:
+            setattr(scene.bikerig_props, role, getattr(scene.bikerig_bikes[0], role))
+
+        self.report({'INFO'}, f"Found {len(scene.bikerig_bikes)} bikes in "
+                              f"{(time.perf_counter() - start) * 1000:.0f} ms")
         return {'FINISHED'}
 
-classes = [BikeRig_OT_BuildRig]
+classes = [
+    BikeRig_OT_BuildRig,
+    BikeRig_OT_BuildFleet,
+    BikeRig_OT_BuildFleetModal,
+    BikeRig_OT_CancelBuild,
+    BikeRig_OT_DetectParts,
+    BikeRig_OT_DiscoverBikes,
+]
 
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    bpy.app.handlers.load_post.append(clear_templates)
+    bpy.app.handlers.load_post.append(reset_build_progress)
 
 def unregister():
+    bpy.app.handlers.load_post.remove(reset_build_progress)
+    bpy.app.handlers.load_post.remove(clear_templates)
+    clear_templates()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
@@ -0,0 +1,163 @@
+"""Sampling of the curves bikes are driven along.
+
+Splines are read with foreach_get and sampled in NumPy, Bezier segments all
+at once, into a world space polyline with its cumulative length: the curve's
+arc length lookup table. Tables are cached per curve object and marked stale
+from a depsgraph handler when the curve is edited or moved.
+"""
+
+import bpy
+import numpy as np
+
+# Samples per Bezier segment of the polyline
+SEGMENT_SAMPLES = 32
+
+# curve object pointer -> lookup table (see get_lut)
+_lut_cache = {}
+# curve objects edited since their table was built
+_dirty = set()
+
+
+def is_curve(obj):
+    """A curve object whose first spline has a segment to drive along"""
+    if obj is None or obj.type != 'CURVE' or not obj.data.splines:
+        return False
+    spline = obj.data.splines[0]
+    return len(spline.bezier_points if spline.type == 'BEZIER' else spline.points) > 1
+
+
+def read_spline(spline):
+    """Control points of a spline: (co, handle_left, handle_right) for Bezier, (co,) otherwise"""
+    if spline.type == 'BEZIER':
+        points = spline.bezier_points
+        out = []
+        for attr in ("co", "handle_left", "handle_right"):
+            buf = np.empty(len(points) * 3, dtype=np.float64)
+            points.foreach_get(attr, buf)
+            out.append(buf.reshape(-1, 3))
+        return tuple(out)
+
+    # Poly and NURBS points are 4D (w), NURBS are approximated by their control polygon
+    buf = np.empty(len(spline.points) * 4, dtype=np.float64)
+    spline.points.foreach_get("co", buf)
+    return (buf.reshape(-1, 4)[:, :3],)
+
+
+def bezier_points(co, left, right, cyclic, samples=SEGMENT_SAMPLES):
+    """Polyline through all Bezier segments of a spline, evaluated in one go, and its curve parameter"""
+    start, end = np.arange(len(co) - 1), np.arange(1, len(co))
+    if cyclic:
+        start, end = np.append(start, len(co) - 1), np.append(end, 0)
+
+    t = np.linspace(0.0, 1.0, samples, endpoint=False)[None, :, None]
+    u = 1.0 - t
+    p0, p1 = co[start][:, None], right[start][:, None]
+    p2, p3 = left[end][:, None], co[end][:, None]
+    points = u**3 * p0 + 3 * u * u * t * p1 + 3 * u * t * t * p2 + t**3 * p3
+    params = (start[:, None] + t[..., 0]).ravel()
+    return np.concatenate((points.reshape(-1, 3), co[end[-1:]])), np.append(params, len(start))
+
+
+def spline_points(spline):
+    """Polyline of a spline in the curve's local space and the curve parameter of its points"""
+    data = read_spline(spline)
+    if spline.type == 'BEZIER':
+        return bezier_points(*data, spline.use_cyclic_u)
+    co = data[0]
+    if spline.use_cyclic_u:
+        co = np.concatenate((co, co[:1]))
+    return co, np.arange(len(co), dtype=np.float64)
+
+
+def curve_key(obj):
+    """Hash of a curve object's splines and placement, changes whenever its shape does"""
+    parts = [tuple(v for row in obj.matrix_world for v in row)]
+    for spline in obj.data.splines:
+        parts.append((spline.type, spline.use_cyclic_u) + tuple(hash(a.tobytes()) for a in read_spline(spline)))
+    return hash(tuple(parts))
+
+
+def sample_curve(obj):
+    """World space polyline of a curve's first spline, the cumulative length and curve parameter at its points"""
+    points, params = spline_points(obj.data.splines[0])
+    matrix = np.array(obj.matrix_world)
+    points = points @ matrix[:3, :3].T + matrix[:3, 3]
+    lengths = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))))
+    return points, lengths, params
+
+
+def get_lut(obj):
+    """Arc length lookup table of a curve object: "points", "lengths" and "params" arrays and the curve's "key".
+
+    Cached on the object; after an edit reported by the depsgraph the
+    control points are hashed again and the curve is only resampled if they
+    actually changed. None for a curve without a segment (see is_curve).
+    """
+    if not is_curve(obj):
+        return None
+    pointer = obj.as_pointer()
+    lut = _lut_cache.get(pointer)
+    if lut and pointer not in _dirty:
+        return lut
+
+    _dirty.discard(pointer)
+    key = curve_key(obj)
+    if not lut or lut["key"] != key:
+        points, lengths, params = sample_curve(obj)
+        lut = _lut_cache[pointer] = {
+            "key": key, "data": obj.data.as_pointer(), "points": points, "lengths": lengths, "params": params}
+    return lut
+
+
+def locate(lengths, distances):
+    """Segment index and blend factor of distances along a polyline, by binary search"""
+    distances = np.clip(distances, 0.0, lengths[-1])
+    index = np.clip(np.searchsorted(lengths, distances, side='right') - 1, 0, len(lengths) - 2)
+    span = lengths[index + 1] - lengths[index]
+    factor = np.where(span > 0.0, (distances - lengths[index]) / np.maximum(span, 1e-12), 0.0)
+    return index, factor
+
+
+def points_at(points, lengths, distances):
+    """Points (or any per point values) at the given distances along a polyline"""
+    index, factor = locate(lengths, distances)
+    if points.ndim > 1:
+        factor = factor[:, None]
+    return points[index] + (points[index + 1] - points[index]) * factor
+
+
+def parameter_at(lut, distances):
+    """Curve parameter (segment index + fraction) at distances along a curve"""
+    return points_at(lut["params"], lut["lengths"], distances)
+
+
+@bpy.app.handlers.persistent
+def curve_updated(scene, depsgraph):
+    """Mark the tables of edited or moved curves as stale"""
+    if not _lut_cache:
+        return
+    changed = set()
+    for update in depsgraph.updates:
+        if update.is_updated_geometry or update.is_updated_transform:
+            changed.add(update.id.original.as_pointer())
+    if not changed:
+        return
+    for pointer, lut in _lut_cache.items():
+        if pointer in changed or lut["data"] in changed:
+            _dirty.add(pointer)
+
+
+@bpy.app.handlers.persistent
+def clear_caches(*args):
+    _lut_cache.clear()
+    _dirty.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(curve_updated)
+    bpy.app.handlers.load_post.append(clear_caches)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(clear_caches)
+    bpy.app.handlers.depsgraph_update_post.remove(curve_updated)
+    clear_caches()
@@ -0,0 +1,229 @@
+"""Path following: drive a rig's front wheel along a curve.
+
+The front contact point follows the curve and the rear one the tractrix it
+pulls behind, so the bike cuts corners like a real one. Root motion,
+steering and wheel spin are baked from both contact paths.
+"""
+
+import bpy
+import math
+import numpy as np
+
+from . import bake
+from . import curves
+from . import kinematics
+from . import sampler
+
+# Integration steps per wheelbase travelled
+STEPS_PER_WHEELBASE = 32
+MAX_STEPS = 100000
+
+# Speed profile resolution and the stretch (meters) corner speeds are averaged over
+PROFILE_STEP = 0.1
+CORNER_WINDOW = 1.0
+
+# (curve key, wheelbase, distances hash) -> (front, rear, tangent) world arrays per frame
+_path_cache = {}
+
+
+def get_wheelbase(arm_obj):
+    """Distance between the contact points in world space"""
+    front, rear = bake.get_contacts(arm_obj)
+    return float(np.linalg.norm(np.array(arm_obj.matrix_world.to_3x3()) @ (front - rear)))
+
+
+def get_profile(lut, frames, scene, props):
+    """Front wheel distance along a curve per frame and its speed (m/s), plus the top speed and arrival time.
+
+    CONSTANT covers the curve at one speed over the frames. FASTEST is the
+    time optimal profile under the acceleration, braking, lateral G and top
+    speed limits, starting and ending at rest; FIT is that profile slowed
+    down (capped) to arrive on the last frame.
+    """
+    fps = scene.render.fps / scene.render.fps_base
+    scale = scene.unit_settings.scale_length
+    length = lut["lengths"][-1] * scale
+    duration = max(len(frames) - 1, 1) / fps
+
+    if props.speed_mode == 'CONSTANT':
+        speed = length / duration
+        return np.linspace(0.0, lut["lengths"][-1], len(frames)), np.full(len(frames), speed), speed, duration
+
+    # Corner speeds along the curve, in meters
+    steps = int(np.clip(math.ceil(length / PROFILE_STEP), 16, MAX_STEPS))
+    distances = np.linspace(0.0, length, steps + 1)
+    points = curves.points_at(lut["points"], lut["lengths"], distances / scale) * scale
+    curvature, _ = kinematics.path_curvature(points, distances)
+    curvature = kinematics.smooth(curvature, max(int(CORNER_WINDOW / (length / steps)), 1))
+    limits = kinematics.corner_speeds(curvature, props.lateral_g * bake.GRAVITY, props.max_speed)
+
+    if props.speed_mode == 'FIT':
+        cap = kinematics.fit_speed_cap(distances, limits, props.acceleration, props.braking, duration)
+        limits = np.minimum(limits, cap)
+    speeds = kinematics.speed_profile(distances, limits, props.acceleration, props.braking)
+    times = kinematics.travel_times(distances, speeds)
+
+    # Per frame; after arriving the bike stands at the end
+    seconds = (frames - frames[0]) / fps
+    return (np.interp(seconds, times, distances) / scale, np.interp(seconds, times, speeds),
+            float(speeds.max()), float(times[-1]))
+
+
+def integrate(jobs):
+    """Contact paths of many bikes along their curves, integrated together.
+
+    jobs is a list of (points, lengths, wheelbase, distances): a curve
+    polyline, the wheelbase and the front wheel's distance along the curve
+    per frame. Every bike gets the same number of steps over its own curve,
+    so one tractrix pass advances all of them. Returns (front, rear, tangent)
+    per job, one row per frame.
+    """
+    steps = max(int(math.ceil(lengths[-1] / wheelbase * STEPS_PER_WHEELBASE)) for _, lengths, wheelbase, _ in jobs)
+    steps = min(max(steps, 2), MAX_STEPS) + 1
+
+    grids = [np.linspace(0.0, lengths[-1], steps) for _, lengths, _, _ in jobs]
+    fronts = np.stack([curves.points_at(points, lengths, grid) for (points, lengths, _, _), grid in zip(jobs, grids)])
+    wheelbases = np.array([wheelbase for _, _, wheelbase, _ in jobs])
+
+    # Start lined up with the curve, one wheelbase behind its first point
+    tangents = kinematics.normalize(np.gradient(fronts, axis=1))
+    rears = kinematics.tractrix(fronts, wheelbases, fronts[:, 0] - tangents[:, 0] * wheelbases[:, None])
+
+    out = []
+    for i, (points, lengths, _, distances) in enumerate(jobs):
+        out.append((
+            curves.points_at(points, lengths, distances),
+            curves.points_at(rears[i], grids[i], distances),
+            kinematics.normalize(curves.points_at(tangents[i], grids[i], distances)),
+        ))
+    return out
+
+
+def get_contact_paths(rigs, frames, profiles):
+    """Front and rear contact paths of rigs following their curves, {rig name: (front, rear, tangent)}.
+
+    profiles holds the front wheel's distance per frame of every rig. Paths
+    are cached until the curve, the wheelbase or the timing change, only the
+    others are integrated (all in one pass).
+    """
+    out = {}
+    todo = []
+    for arm_obj in rigs:
+        lut = curves.get_lut(arm_obj.bikerig_path)
+        wheelbase = get_wheelbase(arm_obj)
+        distances = profiles[arm_obj.name][0]
+
+        key = (lut["key"], round(wheelbase, 6), hash(distances.tobytes()))
+        if key in _path_cache:
+            out[arm_obj.name] = _path_cache[key]
+        else:
+            todo.append((arm_obj.name, key, (lut["points"], lut["lengths"], wheelbase, distances)))
+
+    if todo:
+        for (name, key, _), paths in zip(todo, integrate([job for _, _, job in todo])):
+            _path_cache[key] = out[name] = paths
+    return out
+
+
+def bake_speed(arm_obj, frames, profile):
+    """Key the rig's speed (m/s) and store its top speed and arrival time for the panel"""
+    _, speeds, top_speed, arrival = profile
+    arm_obj["bikerig_top_speed"] = top_speed
+    arm_obj["bikerig_arrival"] = arrival
+    arm_obj["bikerig_speed"] = 0.0
+    return [bake.write_keys(arm_obj, '["bikerig_speed"]', 0, frames, speeds, "BikeRig")]
+
+
+def bake_follow(arm_obj, frames, front, rear, tangent):
+    """Key root motion, steering and wheel spin of a rig from its contact paths.
+
+    The root carries the bike: the rear contact on the rear path, heading
+    towards the front contact. Replaces the root's location and rotation keys.
+    """
+    name = arm_obj.name
+    world = np.array(arm_obj.matrix_world)
+    inverse = np.linalg.inv(world)
+    rest_front, rest_rear = bake.get_contacts(arm_obj)
+
+    # Targets in armature space
+    rear_local = rear @ inverse[:3, :3].T + inverse[:3, 3]
+    front_local = front @ inverse[:3, :3].T + inverse[:3, 3]
+    heading = front_local - rear_local
+    yaw = np.unwrap(kinematics.heading_angle(heading) - kinematics.heading_angle(rest_front - rest_rear))
+
+    # Root motion: rest rear contact to the rear path, turned by yaw about Z
+    motion = np.zeros((len(frames), 4, 4))
+    motion[:, 0, 0] = motion[:, 1, 1] = np.cos(yaw)
+    motion[:, 1, 0] = np.sin(yaw)
+    motion[:, 0, 1] = -motion[:, 1, 0]
+    motion[:, 2, 2] = motion[:, 3, 3] = 1.0
+    motion[:, :3, 3] = rear_local - motion[:, :3, :3] @ rest_rear
+
+    rest = np.array(arm_obj.data.bones["root"].matrix_local)
+    basis = np.linalg.inv(rest) @ motion @ rest
+    index, sign = bake.bone_axis(arm_obj, "root", (0.0, 0.0, 1.0))
+    fcurves = [bake.write_keys(arm_obj, sampler.bone_path("root", "rotation_euler"), index, frames, sign * yaw, "root")]
+    fcurves += bake.write_vector(arm_obj, sampler.bone_path("root", "location"), frames, basis[:, :3, 3], "root")
+
+    # Steering: from the bike's heading to the front wheel's direction of travel
+    rake = math.radians(arm_obj.get("bikerig_rake", 0.0))
+    steer = kinematics.signed_angle(front - rear, tangent) / math.cos(rake)
+    fcurves += bake.bake_steering(arm_obj, frames, {name: steer})
+
+    # Each wheel rolls along its own path, both axles pointing to the bike's right
+    axles = kinematics.normalize(np.cross(heading, kinematics.UP))
+    return fcurves + bake.bake_wheel_spin(arm_obj, frames, {
+        (name, "f_wheel"): kinematics.rolled_distance(front_local, axles),
+        (name, "b_wheel"): kinematics.rolled_distance(rear_local, axles),
+    })
+
+
+class BikeRig_OT_FollowPath(bpy.types.Operator):
+    """Drive the selected rigs along their path curve over the scene range (bakes root motion, steering and wheel spin)"""
+    bl_idname = "bikerig.follow_path"
+    bl_label = "Follow Path"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        rigs = [r for r in bake.get_rigs(context) if curves.is_curve(r.bikerig_path)]
+        if not rigs:
+            self.report({'ERROR'}, "Select a BikeRig rig with a path curve!")
+            return {'CANCELLED'}
+        rigs, skipped = bake.euler_rigs(rigs, "root")
+        if not rigs:
+            self.report({'ERROR'}, "Set the root bone's rotation mode to Euler (XYZ)!")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        frames = bake.get_frames(scene)
+        profiles = {r.name: get_profile(curves.get_lut(r.bikerig_path), frames, scene, scene.bikerig_props) for r in rigs}
+        paths = get_contact_paths(rigs, frames, profiles)
+        stats = []
+        for arm_obj in rigs:
+            fcurves = bake_follow(arm_obj, frames, *paths[arm_obj.name])
+            fcurves += bake_speed(arm_obj, frames, profiles[arm_obj.name])
+            stats.append(bake.decimate_fcurves(arm_obj, fcurves, scene.bikerig_props.bake_tolerance))
+
+        self.report({'WARNING'} if skipped else {'INFO'},
+                    f"{len(rigs)} rigs follow their path ({skipped} with a non Euler root skipped), "
+                    f"{bake.decimation_report(stats)}")
+        return {'FINISHED'}
+
+
+@bpy.app.handlers.persistent
+def clear_caches(*args):
+    _path_cache.clear()
+
+
+classes = [BikeRig_OT_FollowPath]
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.app.handlers.load_post.append(clear_caches)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(clear_caches)
+    clear_caches()
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,342 @@
+"""Ground queries against a set of collider meshes.
+
+All colliders of the ground collection go into one BVH tree that every query
+shares, for all bikes and frames. The tree is cached on the colliders'
+geometry and placement and only rebuilt when one of them changes.
+
+Large terrains can use a heightfield instead: the colliders rasterized once
+into a height grid (stored on the ground collection, so it survives saving),
+looked up with bilinear interpolation in NumPy.
+"""
+
+import bpy
+import hashlib
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+from . import analysis
+
+# Rays start this far above the query points and reach as far below
+RAY_HEIGHT = 100.0
+
+# Largest heightfield (nodes per side), the cells grow beyond that
+MAX_GRID = 4096
+# Triangle to grid node pairs rasterized per NumPy pass
+RASTER_CHUNK = 1 << 22
+# Random points the heightfield is checked against ray casts at
+ERROR_SAMPLES = 1000
+
+# Collection ID properties the heightfield is stored in, hidden from the Custom Properties panel:
+# the grid as packed float32 bytes, and its key, origin, size, cell, shape and error
+FIELD_PROP = "_bikerig_heightfield"
+INFO_PROP = "_bikerig_heightfield_info"
+
+# collider set (object pointers) -> (colliders key, BVH tree)
+_tree_cache = {}
+# ground collection pointer -> heightfield
+_field_cache = {}
+
+
+def get_colliders(scene):
+    """Mesh objects of the scene's ground collection"""
+    coll = scene.bikerig_props.ground_collection
+    return sorted((o for o in coll.all_objects if o.type == 'MESH'), key=lambda o: o.name) if coll else []
+
+
+def read_collider(obj, depsgraph):
+    """Local vertices (modifiers applied) and triangles of a collider"""
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        co = analysis.read_vertices(mesh)
+        mesh.calc_loop_triangles()
+        tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tris)
+    finally:
+        obj_eval.to_mesh_clear()
+    return co, tris.reshape(-1, 3)
+
+
+def build_tree(data):
+    """One BVH tree over the world space triangles of all colliders"""
+    vertices, polygons = world_triangles(data)
+    return BVHTree.FromPolygons(vertices.tolist(), polygons.tolist())
+
+
+def read_colliders(context, colliders):
+    """(object, local vertices, triangles) of every collider and a key that changes with any of them"""
+    depsgraph = context.evaluated_depsgraph_get()
+    data = [(obj, *read_collider(obj, depsgraph)) for obj in colliders]
+    key = tuple((analysis.geometry_key(obj.data, co), hash(tris.tobytes()), tuple(v for row in obj.matrix_world for v in row))
+                for obj, co, tris in data)
+    return data, key
+
+
+def get_tree(context, colliders=None):
+    """BVH tree of the ground colliders (None without any), rebuilt only when they changed"""
+    if colliders is None:
+        colliders = get_colliders(context.scene)
+    if not colliders:
+        return None
+
+    data, key = read_colliders(context, colliders)
+    pointers = tuple(obj.as_pointer() for obj in colliders)
+    cached = _tree_cache.get(pointers)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    tree = build_tree(data)
+    _tree_cache[pointers] = (key, tree)
+    return tree
+
+
+def cast_down(tree, points):
+    """Ground straight under (and over) points: heights, upward normals and a hit mask.
+
+    points is any (..., 3) array, e.g. every wheel of every bike on every
+    frame, all cast against the one tree.
+    """
+    shape = points.shape[:-1]
+    flat = points.reshape(-1, 3)
+    heights = np.full(len(flat), np.nan)
+    normals = np.tile((0.0, 0.0, 1.0), (len(flat), 1))
+
+    down = Vector((0.0, 0.0, -1.0))
+    ray_cast = tree.ray_cast
+    for i, (x, y, z) in enumerate(flat.tolist()):
+        location, normal, _, _ = ray_cast(Vector((x, y, z + RAY_HEIGHT)), down, 2.0 * RAY_HEIGHT)
+        if location is not None:
+            heights[i] = location.z
+            normals[i] = normal if normal.z >= 0.0 else -normal
+
+    hit = ~np.isnan(heights)
+    return heights.reshape(shape), normals.reshape(shape + (3,)), hit.reshape(shape)
+
+
+def world_triangles(data):
+    """World space vertices and triangles of all colliders, merged"""
+    vertices = []
+    polygons = []
+    offset = 0
+    for obj, co, tris in data:
+        matrix = np.array(obj.matrix_world)
+        vertices.append(co @ matrix[:3, :3].T + matrix[:3, 3])
+        polygons.append(tris + offset)
+        offset += len(co)
+    return np.concatenate(vertices), np.concatenate(polygons)
+
+
+def colliders_digest(data, cell):
+    """Hash of the colliders and cell size that stays the same across sessions (for the stored grid)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for obj, co, tris in data:
+        digest.update(np.ascontiguousarray(co).tobytes())
+        digest.update(tris.tobytes())
+        digest.update(np.array(obj.matrix_world, dtype=np.float64).tobytes())
+    digest.update(np.float64(cell).tobytes())
+    return digest.hexdigest()
+
+
+def rasterize(vertices, tris, cell):
+    """Height of the top surface at every node of a grid over the triangles (NaN where there is none).
+
+    All triangle and node pairs inside the triangles' bounds are tested with
+    barycentric coordinates in NumPy, a chunk of triangles per pass. The last
+    row and column of nodes usually lie past the triangles, they take the
+    heights at the bounds instead so the grid has no empty border.
+    Returns the grid origin (x, y), its size (x, y) up to the bounds, the cell
+    size and the (rows, columns) heights.
+    """
+    low = vertices[:, :2].min(axis=0)
+    size = vertices[:, :2].max(axis=0) - low
+    cell = max(cell, float(size.max()) / (MAX_GRID - 1), 1e-6)
+    nx, ny = (np.ceil(size / cell).astype(np.int64) + 1)
+    heights = np.full(ny * nx, -np.inf)
+
+    corners = vertices[tris]
+    xy = (corners[..., :2] - low) / cell
+    # Bounds in cells, the last node of each axis is clamped to them
+    edge = size / cell
+    low_xy = xy.min(axis=1)
+    high_xy = xy.max(axis=1)
+    jmin = np.clip(np.ceil(low_xy[:, 0]), 0, nx - 1).astype(np.int64)
+    jmax = np.clip(np.where(high_xy[:, 0] >= edge[0], nx - 1, np.floor(high_xy[:, 0])), 0, nx - 1).astype(np.int64)
+    imin = np.clip(np.ceil(low_xy[:, 1]), 0, ny - 1).astype(np.int64)
+    imax = np.clip(np.where(high_xy[:, 1] >= edge[1], ny - 1, np.floor(high_xy[:, 1])), 0, ny - 1).astype(np.int64)
+    width = np.maximum(jmax - jmin + 1, 0)
+    counts = width * np.maximum(imax - imin + 1, 0)
+
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(tris):
+        stop = max(int(np.searchsorted(ends, ends[start] - counts[start] + RASTER_CHUNK, side='right')), start + 1)
+        chunk = np.arange(start, stop)
+        start = stop
+        n = counts[chunk]
+        if not n.sum():
+            continue
+
+        tri = np.repeat(chunk, n)
+        local = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        j = jmin[tri] + local % width[tri]
+        i = imin[tri] + local // width[tri]
+
+        a, b, c = xy[tri, 0], xy[tri, 1], xy[tri, 2]
+        v0, v1 = b - a, c - a
+        px, py = np.minimum(j, edge[0]) - a[:, 0], np.minimum(i, edge[1]) - a[:, 1]
+        den = v0[:, 0] * v1[:, 1] - v1[:, 0] * v0[:, 1]
+        safe = np.where(den == 0.0, 1.0, den)
+        l1 = (px * v1[:, 1] - v1[:, 0] * py) / safe
+        l2 = (v0[:, 0] * py - px * v0[:, 1]) / safe
+        l0 = 1.0 - l1 - l2
+        inside = (den != 0.0) & (l0 >= -1e-9) & (l1 >= -1e-9) & (l2 >= -1e-9)
+
+        z = corners[tri, :, 2]
+        z = l0 * z[:, 0] + l1 * z[:, 1] + l2 * z[:, 2]
+        np.maximum.at(heights, (i * nx + j)[inside], z[inside])
+
+    heights[np.isinf(heights)] = np.nan
+    return (float(low[0]), float(low[1])), (float(size[0]), float(size[1])), cell, heights.reshape(ny, nx)
+
+
+def sample_heightfield(field, points):
+    """Like cast_down, from a heightfield: bilinear heights and the normals of that surface.
+
+    The last row and column of nodes sit at the grid's bounds, so the last
+    cells are narrower than the others.
+    """
+    shape = points.shape[:-1]
+    flat = points.reshape(-1, 3)
+    heights = field["heights"]
+    ny, nx = heights.shape
+    cell = field["cell"]
+    ex, ey = (s / cell for s in field["size"])
+
+    u = (flat[:, 0] - field["origin"][0]) / cell
+    v = (flat[:, 1] - field["origin"][1]) / cell
+    j = np.clip(np.floor(u), 0, nx - 2).astype(np.int64)
+    i = np.clip(np.floor(v), 0, ny - 2).astype(np.int64)
+    width = np.minimum(j + 1, ex) - j
+    depth = np.minimum(i + 1, ey) - i
+    fu = np.clip((u - j) / width, 0.0, 1.0)
+    fv = np.clip((v - i) / depth, 0.0, 1.0)
+
+    z00, z10 = heights[i, j], heights[i, j + 1]
+    z01, z11 = heights[i + 1, j], heights[i + 1, j + 1]
+    z = (z00 * (1 - fu) + z10 * fu) * (1 - fv) + (z01 * (1 - fu) + z11 * fu) * fv
+    dzdx = ((z10 - z00) * (1 - fv) + (z11 - z01) * fv) / (width * cell)
+    dzdy = ((z01 - z00) * (1 - fu) + (z11 - z10) * fu) / (depth * cell)
+
+    hit = (u >= 0) & (u <= ex) & (v >= 0) & (v <= ey) & np.isfinite(z)
+    normals = np.column_stack((-dzdx, -dzdy, np.ones_like(z)))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    normals[~hit] = (0.0, 0.0, 1.0)
+    z[~hit] = np.nan
+    return z.reshape(shape), normals.reshape(shape + (3,)), hit.reshape(shape)
+
+
+def heightfield_error(field, tree, samples=ERROR_SAMPLES):
+    """Largest and mean height difference of the heightfield from ray casts at random points in it"""
+    rng = np.random.default_rng(0)
+    points = np.zeros((samples, 3))
+    points[:, 0] = field["origin"][0] + rng.uniform(0, field["size"][0], samples)
+    points[:, 1] = field["origin"][1] + rng.uniform(0, field["size"][1], samples)
+    points[:, 2] = np.nanmean(field["heights"]) if np.isfinite(field["heights"]).any() else 0.0
+
+    exact, _, hit = cast_down(tree, points)
+    approx, _, approx_hit = sample_heightfield(field, points)
+    both = hit & approx_hit
+    if not both.any():
+        return 0.0, 0.0
+    error = np.abs(exact[both] - approx[both])
+    return float(error.max()), float(error.mean())
+
+
+def get_heightfield(context, rebuild=False):
+    """Heightfield of the scene's ground collection (None without colliders).
+
+    Kept in memory and on the collection; only rasterized again when the
+    colliders or the cell size changed (or rebuild is set), reopening the file
+    loads the stored grid.
+    """
+    scene = context.scene
+    coll = scene.bikerig_props.ground_collection
+    colliders = get_colliders(scene)
+    if not colliders:
+        return None
+
+    cell = scene.bikerig_props.heightfield_cell
+    data, _ = read_colliders(context, colliders)
+    digest = colliders_digest(data, cell)
+
+    field = _field_cache.get(coll.as_pointer())
+    if field and field["key"] == digest and not rebuild:
+        return field
+
+    info = coll.get(INFO_PROP)
+    # Grids stored without their size have an empty border, they are rasterized again
+    if info and info["key"] == digest and "size" in info and not rebuild:
+        heights = np.frombuffer(bytes(coll[FIELD_PROP]), dtype=np.float32).astype(np.float64).reshape(tuple(info["shape"]))
+        field = {"key": digest, "origin": tuple(info["origin"]), "size": tuple(info["size"]), "cell": info["cell"], "heights": heights,
+                 "error": tuple(info["error"])}
+    else:
+        origin, size, cell, heights = rasterize(*world_triangles(data), cell)
+        field = {"key": digest, "origin": origin, "size": size, "cell": cell, "heights": heights}
+        field["error"] = heightfield_error(field, get_tree(context, colliders))
+        # Grids stored as visible lists before are dropped
+        for legacy in ("bikerig_heightfield", "bikerig_heightfield_info"):
+            coll.pop(legacy, None)
+        coll[FIELD_PROP] = heights.astype(np.float32).tobytes()
+        coll[INFO_PROP] = {"key": digest, "origin": origin, "size": size, "cell": cell,
+                           "shape": list(heights.shape), "error": list(field["error"])}
+
+    _field_cache[coll.as_pointer()] = field
+    return field
+
+
+def ground_under(context, points):
+    """Ground under points with the scene's ground mode: heights, normals and hit mask (None without colliders)"""
+    if context.scene.bikerig_props.ground_mode == 'HEIGHTFIELD':
+        field = get_heightfield(context)
+        return sample_heightfield(field, points) if field else None
+    tree = get_tree(context)
+    return cast_down(tree, points) if tree else None
+
+
+class BikeRig_OT_BuildHeightfield(bpy.types.Operator):
+    """Rasterize the ground collection into a heightfield again and check it against ray casts"""
+    bl_idname = "bikerig.build_heightfield"
+    bl_label = "Rebuild Heightfield"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        field = get_heightfield(context, rebuild=True)
+        if not field:
+            self.report({'ERROR'}, "Set a ground collection with meshes!")
+            return {'CANCELLED'}
+
+        ny, nx = field["heights"].shape
+        self.report({'INFO'}, f"Heightfield {nx}x{ny}, {field['cell']:.3f} cells, "
+                              f"error max {field['error'][0]:.4f} mean {field['error'][1]:.4f}")
+        return {'FINISHED'}
+
+
+@bpy.app.handlers.persistent
+def clear_caches(*args):
+    _tree_cache.clear()
+    _field_cache.clear()
+
+
+classes = [BikeRig_OT_BuildHeightfield]
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.app.handlers.load_post.append(clear_caches)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(clear_caches)
+    clear_caches()
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,208 @@
+"""Vectorized bike kinematics on sampled trajectories.
+
+Plain NumPy, no bpy: every function works on arrays with one row per frame.
+"""
+
+import numpy as np
+
+UP = np.array([0.0, 0.0, 1.0])
+
+
+def normalize(v):
+    return v / np.maximum(np.linalg.norm(v, axis=-1, keepdims=True), 1e-12)
+
+
+def contact_points(centers, axles, radius):
+    """Ground contact points under the wheel centers: one radius down, square to the axle"""
+    down = (axles @ UP)[:, None] * axles - UP
+    return centers + normalize(down) * radius
+
+
+def rolled_distance(points, axles):
+    """Signed cumulative arc length a wheel rolls along its contact point trajectory.
+
+    Motion along the axle (sliding sideways) doesn't turn the wheel, so every
+    step is projected onto the wheel plane first. Axles point to the wheel's
+    right, a step along UP x axle rolls it forwards, against it backwards.
+    Returns one distance per frame, starting at 0.
+    """
+    step = np.diff(points, axis=0)
+    axle = normalize(axles[1:] + axles[:-1])
+    rolling = step - np.sum(step * axle, axis=1)[:, None] * axle
+    sign = np.where(np.sum(step * np.cross(UP, axle), axis=1) < 0.0, -1.0, 1.0)
+    return np.concatenate(([0.0], np.cumsum(np.linalg.norm(rolling, axis=1) * sign)))
+
+
+def path_curvature(points, frames):
+    """Signed curvature of a trajectory seen from above (positive turning left) and its velocity"""
+    velocity = np.gradient(points, frames, axis=0)
+    accel = np.gradient(velocity, frames, axis=0)
+    speed = np.linalg.norm(velocity[:, :2], axis=1)
+    cross = velocity[:, 0] * accel[:, 1] - velocity[:, 1] * accel[:, 0]
+    return cross / np.maximum(speed, 1e-12) ** 3, velocity
+
+
+def steer_angle(curvature, wheelbase, rake=0.0):
+    """Kinematic bicycle model: steering angle for a rear wheel path curvature.
+
+    atan(wheelbase * curvature) is the angle on the ground, turning about a
+    steering axis tilted by rake needs 1 / cos(rake) of it.
+    """
+    return np.arctan(wheelbase * curvature) / np.cos(rake)
+
+
+def hold(values, valid):
+    """Replace invalid samples with the last valid one (the first valid one at the start)"""
+    if not valid.any():
+        return np.zeros_like(values)
+    index = np.where(valid, np.arange(len(values)), 0)
+    index = np.maximum.accumulate(index)
+    index[:np.argmax(valid)] = np.argmax(valid)
+    return values[index]
+
+
+def smooth(values, window):
+    """Centered moving average over window samples, the ends are padded with the edge values"""
+    if window <= 1:
+        return values
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode='edge')
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+
+def lean_angle(curvature, speed, gravity=9.81):
+    """Balanced lean into a turn, atan(v^2 / (g * r)), in SI units. Positive leans left"""
+    return np.arctan(speed * speed * curvature / gravity)
+
+
+def heading_angle(directions):
+    """Angle about +Z from +Y to directions, seen from above"""
+    return np.arctan2(-directions[..., 0], directions[..., 1])
+
+
+def signed_angle(a, b):
+    """Angle about +Z from a to b, seen from above"""
+    cross = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    return np.arctan2(cross, a[:, 0] * b[:, 0] + a[:, 1] * b[:, 1])
+
+
+def tractrix(fronts, wheelbases, rears):
+    """Rear contact paths pulled along by front contact paths, for many bikes at once.
+
+    fronts is (bikes, steps, 3), wheelbases (bikes,) and rears the rear
+    contact points at the first step. Every step the rear wheel moves
+    straight towards the front wheel's new position and stays one wheelbase
+    behind it: the discrete tractrix, the path of a rear wheel that can't
+    slide sideways. Bikes are advanced together, one NumPy operation per step.
+    """
+    out = np.empty_like(fronts)
+    rear = np.array(rears, dtype=np.float64)
+    wheelbases = np.asarray(wheelbases, dtype=np.float64)[:, None]
+    for step in range(fronts.shape[1]):
+        rear = fronts[:, step] - normalize(fronts[:, step] - rear) * wheelbases
+        out[:, step] = rear
+    return out
+
+
+def corner_speeds(curvature, lateral_accel, max_speed):
+    """Highest speed along a path: the lateral acceleration limit in corners, capped at max_speed"""
+    return np.minimum(np.sqrt(lateral_accel / np.maximum(np.abs(curvature), 1e-9)), max_speed)
+
+
+def speed_profile(distances, limits, accel, brake, start=0.0, end=0.0):
+    """Time optimal speed at distances along a path, in closed form.
+
+    The fastest speed reachable at s_i accelerating from any s_j behind is
+    v^2 = min over j <= i of (limit_j^2 + 2 * accel * (s_i - s_j)), a running
+    minimum; braking for every limit ahead is the same backwards. Starts at
+    start and ends at end speed.
+    """
+    limit = np.asarray(limits, dtype=np.float64) ** 2
+    limit[0] = min(limit[0], start * start)
+    limit[-1] = min(limit[-1], end * end)
+
+    forward = 2.0 * accel * distances + np.minimum.accumulate(limit - 2.0 * accel * distances)
+    backward = np.minimum.accumulate((limit + 2.0 * brake * distances)[::-1])[::-1] - 2.0 * brake * distances
+    return np.sqrt(np.maximum(np.minimum(forward, backward), 0.0))
+
+
+def travel_times(distances, speeds):
+    """Time at which each distance is reached, constant acceleration between samples"""
+    step = np.diff(distances)
+    mean = np.maximum(speeds[1:] + speeds[:-1], 1e-9) * 0.5
+    return np.concatenate(([0.0], np.cumsum(step / mean)))
+
+
+def fit_speed_cap(distances, limits, accel, brake, duration, steps=40):
+    """Speed cap making the time optimal profile last duration (bisection, time falls as the cap rises).
+
+    Returns the uncapped top speed when even that is too slow.
+    """
+    low, high = 0.0, float(limits.max())
+    if travel_times(distances, speed_profile(distances, limits, accel, brake))[-1] >= duration:
+        return high
+    for _ in range(steps):
+        cap = (low + high) * 0.5
+        time = travel_times(distances, speed_profile(distances, np.minimum(limits, cap), accel, brake))[-1]
+        if time > duration:
+            low = cap
+        else:
+            high = cap
+    return high
+
+
+def load_transfer(accel, height, wheelbase, frequency):
+    """Extra compression (front, rear) from pitching under acceleration, in SI units.
+
+    Braking (negative accel) moves m * a * h / L of the weight to the front,
+    each end's spring carries half the bike at the given natural frequency.
+    """
+    squat = 2.0 * accel * height / (wheelbase * (2.0 * np.pi * frequency) ** 2)
+    return -squat, squat
+
+
+def spring_damper(ground, load, dt, frequency, damping, travel, extension, max_step=0.25):
+    """Spring-damper suspension of many wheels at once, (wheels, frames) arrays in and out.
+
+    The sprung body over each wheel is pulled towards the ground under it
+    lowered by load (the extra compression) by a spring of the given natural
+    frequency (Hz) and damping ratio; the damper works against the body's
+    speed relative to the wheel. Semi implicit Euler, substepped so that
+    omega * step stays under max_step: only the time steps loop in Python,
+    every wheel of every bike moves together. Compression stays within
+    [-extension, travel]; at a stop the body moves with the wheel.
+    Returns the compression (ground - body, positive compressed) and the body
+    heights, absolute in the same frame as ground rather than relative to rest.
+    """
+    omega = 2.0 * np.pi * frequency
+    stiffness, friction = omega * omega, 2.0 * damping * omega
+    substeps = max(int(np.ceil(omega * (1.0 + damping) * dt / max_step)), 1)
+    step = dt / substeps
+
+    target = ground - load
+    rates = np.diff(ground, axis=1) / dt
+    body = np.empty_like(target)
+    height = body[:, 0] = target[:, 0]
+    speed = rates[:, 0].copy() if rates.shape[1] else np.zeros(len(ground))
+
+    for i in range(1, ground.shape[1]):
+        start, delta = target[:, i - 1], (target[:, i] - target[:, i - 1]) / substeps
+        rate = rates[:, i - 1]
+        for sub in range(1, substeps + 1):
+            speed += step * (stiffness * (start + delta * sub - height) + friction * (rate - speed))
+            height = height + step * speed
+        low, high = ground[:, i] - travel, ground[:, i] + extension
+        stop = (height < low) | (height > high)
+        if stop.any():
+            height = np.clip(height, low, high)
+            speed[stop] = rate[stop]
+        body[:, i] = height
+
+    return ground - body, body
+
+
+def axis_rotations(axis, angles):
+    """(n, 3, 3) rotation matrices by angles about one axis (Rodrigues)"""
+    x, y, z = axis
+    cross = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    cos, sin = np.cos(angles)[:, None, None], np.sin(angles)[:, None, None]
+    return cos * np.eye(3) + sin * cross + (1.0 - cos) * np.outer(axis, axis)
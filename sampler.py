@@ -0,0 +1,317 @@
+"""Depsgraph free sampling of rig motion.
+
+Evaluates the action's F-curves in NumPy for all frames at once and composes
+object and bone transforms, instead of stepping the scene with frame_set.
+Rigs with constraints, drivers or NLA fall back to frame_set.
+"""
+
+import numpy as np
+
+# BezTriple interpolation codes, anything above BEZIER is an easing curve
+CONSTANT, LINEAR, BEZIER = 0, 1, 2
+INTERPOLATIONS = {'CONSTANT': CONSTANT, 'LINEAR': LINEAR, 'BEZIER': BEZIER}
+
+# Bisection steps used to invert the Bezier x(t), 2^-30 of a segment is plenty
+BEZIER_STEPS = 30
+
+TRANSFORM_PATHS = ("location", "rotation_euler", "rotation_quaternion", "rotation_axis_angle", "scale")
+
+
+def bone_path(bone_name, prop):
+    return f'pose.bones["{bone_name}"].{prop}'
+
+
+def read_keys(fcurve):
+    """Keyframe data of an F-curve as arrays, each read with a single foreach_get"""
+    n = len(fcurve.keyframe_points)
+    keys = {}
+    for attr in ("co", "handle_left", "handle_right"):
+        buf = np.empty(n * 2, dtype=np.float64)
+        fcurve.keyframe_points.foreach_get(attr, buf)
+        keys[attr] = buf.reshape(n, 2)
+    try:
+        ipo = np.empty(n, dtype=np.int32)
+        fcurve.keyframe_points.foreach_get("interpolation", ipo)
+    except (TypeError, RuntimeError):
+        ipo = np.array([INTERPOLATIONS.get(k.interpolation, BEZIER + 1) for k in fcurve.keyframe_points])
+    keys["interpolation"] = ipo
+    return keys
+
+
+def evaluate_bezier(p0, p1, p2, p3, frames):
+    """Value of 2D Bezier segments (frame, value) at the given frames, all at once.
+
+    Handles are shortened like Blender does so x(t) is monotonic, then
+    x(t) = frame is solved by bisection.
+    """
+    # BKE_fcurve_correct_bezpart
+    h1 = p1 - p0
+    h2 = p2 - p3
+    length = p3[:, 0] - p0[:, 0]
+    total = np.abs(h1[:, 0]) + np.abs(h2[:, 0])
+    fac = np.where(total > length, length / np.maximum(total, 1e-12), 1.0)[:, None]
+    p1 = p0 + h1 * fac
+    p2 = p3 + h2 * fac
+
+    lo = np.zeros(len(frames))
+    hi = np.ones(len(frames))
+    for _ in range(BEZIER_STEPS):
+        t = (lo + hi) * 0.5
+        u = 1.0 - t
+        x = u**3 * p0[:, 0] + 3 * u * u * t * p1[:, 0] + 3 * u * t * t * p2[:, 0] + t**3 * p3[:, 0]
+        below = x < frames
+        lo = np.where(below, t, lo)
+        hi = np.where(below, hi, t)
+
+    t = (lo + hi) * 0.5
+    u = 1.0 - t
+    return u**3 * p0[:, 1] + 3 * u * u * t * p1[:, 1] + 3 * u * t * t * p2[:, 1] + t**3 * p3[:, 1]
+
+
+def evaluate_keys(keys, frames, extrapolation='CONSTANT'):
+    """Evaluate constant, linear and Bezier keyframes at many frames in NumPy"""
+    co, hl, hr, ipo = keys["co"], keys["handle_left"], keys["handle_right"], keys["interpolation"]
+    x, y = co[:, 0], co[:, 1]
+    if len(x) == 1:
+        return np.full(len(frames), y[0])
+
+    i = np.clip(np.searchsorted(x, frames, side='right') - 1, 0, len(x) - 2)
+    x0, x1, y0, y1 = x[i], x[i + 1], y[i], y[i + 1]
+    mode = ipo[i]
+
+    out = y0.copy()
+    lin = mode == LINEAR
+    out[lin] = y0[lin] + (y1[lin] - y0[lin]) * (frames[lin] - x0[lin]) / (x1[lin] - x0[lin])
+    bez = mode == BEZIER
+    if bez.any():
+        out[bez] = evaluate_bezier(co[i[bez]], hr[i[bez]], hl[i[bez] + 1], co[i[bez] + 1], frames[bez])
+
+    # Outside the keys
+    before = frames < x[0]
+    after = frames >= x[-1]
+    out[before] = y[0]
+    out[after] = y[-1]
+    if extrapolation == 'LINEAR':
+        out[before] += (frames[before] - x[0]) * end_slope(keys, 0)
+        out[after] += (frames[after] - x[-1]) * end_slope(keys, -1)
+    return out
+
+
+def end_slope(keys, end):
+    """Slope Blender extrapolates with past the first (end=0) or last (end=-1) key"""
+    co, ipo = keys["co"], keys["interpolation"]
+    # Like Blender, the end key's own interpolation decides
+    if ipo[end] == CONSTANT:
+        return 0.0
+    if ipo[end] == LINEAR:
+        other = 1 if end == 0 else -2
+        return (co[other, 1] - co[end, 1]) / (co[other, 0] - co[end, 0])
+    handle = keys["handle_left"] if end == 0 else keys["handle_right"]
+    dx = co[end, 0] - handle[end, 0]
+    return (co[end, 1] - handle[end, 1]) / dx if dx else 0.0
+
+
+def evaluate_fcurve(fcurve, frames):
+    """F-curve values at frames. Easing keys and modifiers use fcurve.evaluate per frame"""
+    keys = read_keys(fcurve)
+    if len(keys["co"]) == 0 or len(fcurve.modifiers) or (keys["interpolation"] > BEZIER).any():
+        return np.array([fcurve.evaluate(f) for f in frames])
+    return evaluate_keys(keys, frames, fcurve.extrapolation)
+
+
+def sample_property(obj, data_path, prop, frames):
+    """(frames, n) values of a vector property: animated channels from the action, others static"""
+    static = np.array(prop, dtype=np.float64)
+    out = np.tile(static, (len(frames), 1))
+    action = obj.animation_data.action if obj.animation_data else None
+    if action:
+        for index in range(len(static)):
+            fcurve = action.fcurves.find(data_path, index=index)
+            if fcurve and not fcurve.mute:
+                out[:, index] = evaluate_fcurve(fcurve, frames)
+    return out
+
+
+def euler_matrices(angles, order):
+    """(frames, 3, 3) rotation matrices of Euler angles in a Blender rotation order"""
+    n = len(angles)
+    mats = {}
+    for axis, a in zip("XYZ", angles.T):
+        c, s = np.cos(a), np.sin(a)
+        m = np.zeros((n, 3, 3))
+        i, j = {"X": (1, 2), "Y": (2, 0), "Z": (0, 1)}[axis]
+        k = 3 - i - j
+        m[:, k, k] = 1.0
+        m[:, i, i] = c
+        m[:, j, j] = c
+        m[:, i, j] = -s
+        m[:, j, i] = s
+        mats[axis] = m
+    # 'XYZ' applies X first: R = Rz @ Ry @ Rx
+    return mats[order[2]] @ mats[order[1]] @ mats[order[0]]
+
+
+def quaternion_matrices(q):
+    q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def axis_angle_matrices(aa):
+    half = aa[:, 0] / 2.0
+    axis = aa[:, 1:] / np.maximum(np.linalg.norm(aa[:, 1:], axis=1, keepdims=True), 1e-12)
+    return quaternion_matrices(np.column_stack((np.cos(half), axis * np.sin(half)[:, None])))
+
+
+def basis_matrices(owner, anim_obj, prefix, frames):
+    """(frames, 4, 4) local basis (loc @ rot @ scale) of an object or pose bone"""
+    loc = sample_property(anim_obj, prefix + "location", owner.location, frames)
+    scale = sample_property(anim_obj, prefix + "scale", owner.scale, frames)
+
+    mode = owner.rotation_mode
+    if mode == 'QUATERNION':
+        rot = quaternion_matrices(sample_property(anim_obj, prefix + "rotation_quaternion", owner.rotation_quaternion, frames))
+    elif mode == 'AXIS_ANGLE':
+        rot = axis_angle_matrices(sample_property(anim_obj, prefix + "rotation_axis_angle", owner.rotation_axis_angle, frames))
+    else:
+        rot = euler_matrices(sample_property(anim_obj, prefix + "rotation_euler", owner.rotation_euler, frames), mode)
+
+    out = np.zeros((len(frames), 4, 4))
+    out[:, :3, :3] = rot * scale[:, None, :]
+    out[:, :3, 3] = loc
+    out[:, 3, 3] = 1.0
+    return out
+
+
+def uses_nla(obj):
+    anim = obj.animation_data
+    if not anim:
+        return False
+    if anim.action_influence != 1.0 or anim.action_blend_type != 'REPLACE':
+        return True
+    return any(not track.mute and len(track.strips) for track in anim.nla_tracks)
+
+
+def bone_chain(arm_obj, bone_names):
+    """All bones needed to pose the given ones, parents before children"""
+    chain = []
+    for name in bone_names:
+        bone = arm_obj.data.bones[name]
+        lineage = []
+        while bone and bone.name not in chain and bone.name not in lineage:
+            lineage.append(bone.name)
+            bone = bone.parent
+        chain.extend(reversed(lineage))
+    return chain
+
+
+def object_chain(obj):
+    chain = []
+    while obj:
+        chain.append(obj)
+        obj = obj.parent
+    return chain
+
+
+def can_sample(arm_obj, bone_names, skip=()):
+    """Whether the bones' world matrices follow from F-curves alone.
+
+    Constraints, drivers on transforms, NLA, delta transforms and non default
+    parenting or inheritance need the depsgraph. Drivers on the skipped
+    (data path, index) channels are ignored, their current value is used,
+    which is only right when they don't matter to the caller (e.g. a wheel's
+    spin for its center and axle).
+    """
+    skip = set(skip)
+    for obj in object_chain(arm_obj):
+        if len(obj.constraints) or uses_nla(obj):
+            return False
+        if obj.parent and obj.parent_type != 'OBJECT':
+            return False
+        if tuple(obj.delta_location) != (0, 0, 0) or tuple(obj.delta_scale) != (1, 1, 1):
+            return False
+        if tuple(obj.delta_rotation_euler) != (0, 0, 0) or tuple(obj.delta_rotation_quaternion) != (1, 0, 0, 0):
+            return False
+
+        paths = set(TRANSFORM_PATHS) | {"delta_" + p for p in TRANSFORM_PATHS}
+        if obj == arm_obj:
+            paths |= {bone_path(b, p) for b in bone_chain(arm_obj, bone_names) for p in TRANSFORM_PATHS}
+        drivers = obj.animation_data.drivers if obj.animation_data else ()
+        if any(not d.mute and d.data_path in paths and (d.data_path, d.array_index) not in skip for d in drivers):
+            return False
+
+    for name in bone_chain(arm_obj, bone_names):
+        bone = arm_obj.data.bones[name]
+        if len(arm_obj.pose.bones[name].constraints):
+            return False
+        if not bone.use_inherit_rotation or bone.inherit_scale != 'FULL' or not bone.use_local_location:
+            return False
+    return True
+
+
+def object_world_matrices(obj, frames):
+    """(frames, 4, 4) world matrices of an object and its animated parents"""
+    world = basis_matrices(obj, obj, "", frames)
+    if obj.parent:
+        parent = object_world_matrices(obj.parent, frames)
+        world = parent @ np.array(obj.matrix_parent_inverse) @ world
+    return world
+
+
+def bone_world_matrices(arm_obj, bone_names, frames):
+    """{bone: (frames, 4, 4)} world matrices of pose bones, evaluated from F-curves only"""
+    world = object_world_matrices(arm_obj, frames)
+    pose = {}
+    for name in bone_chain(arm_obj, bone_names):
+        bone = arm_obj.data.bones[name]
+        rest = np.array(bone.matrix_local)
+        basis = basis_matrices(arm_obj.pose.bones[name], arm_obj, bone_path(name, ""), frames)
+        if bone.parent:
+            offset = np.linalg.inv(np.array(bone.parent.matrix_local)) @ rest
+            pose[name] = pose[bone.parent.name] @ offset @ basis
+        else:
+            pose[name] = rest @ basis
+    return {name: world @ pose[name] for name in bone_names}
+
+
+def sample_bones_frame_set(context, rigs, bone_names, frames):
+    """Depsgraph fallback: step the scene through the frames once for all rigs"""
+    scene = context.scene
+    out = {(r.name, b): np.empty((len(frames), 4, 4)) for r in rigs for b in bone_names}
+    current = scene.frame_current, scene.frame_subframe
+
+    for i, frame in enumerate(frames):
+        scene.frame_set(int(frame), subframe=frame - int(frame))
+        depsgraph = context.evaluated_depsgraph_get()
+        for arm_obj in rigs:
+            arm_eval = arm_obj.evaluated_get(depsgraph)
+            world = arm_eval.matrix_world
+            for bone_name in bone_names:
+                out[(arm_obj.name, bone_name)][i] = world @ arm_eval.pose.bones[bone_name].matrix
+
+    scene.frame_set(*current)
+    return out
+
+
+def sample_bones(context, rigs, bone_names, frames, skip=()):
+    """World matrices of pose bones over frames, {(rig name, bone): (frames, 4, 4) array}.
+
+    Rigs whose motion comes from plain F-curves are evaluated in NumPy without
+    touching the depsgraph, only the others step the scene with frame_set.
+    """
+    out = {}
+    fallback = []
+    for arm_obj in rigs:
+        if can_sample(arm_obj, bone_names, skip):
+            for name, matrices in bone_world_matrices(arm_obj, bone_names, frames).items():
+                out[(arm_obj.name, name)] = matrices
+        else:
+            fallback.append(arm_obj)
+
+    if fallback:
+        out.update(sample_bones_frame_set(context, fallback, bone_names, frames))
+    return out
@@ -1,5 +1,10 @@
 import bpy
 
+from . import core
+from . import bake
+from . import curves
+from . import ground
+
 class BikeRig_Properties(bpy.types.PropertyGroup):
     """Properties for selecting bike parts"""
     frame: bpy.props.PointerProperty(type=bpy.types.Object, name="Frame", description="Main Body/Frame")
@@ -7,10 +12,57 @@ class BikeRig_Properties(bpy.types.PropertyGroup):
     back_wheel: bpy.props.PointerProperty(type=bpy.types.Object, name="Back Wheel")
     fork: bpy.props.PointerProperty(type=bpy.types.Object, name="Fork", description="Front Fork (holds front wheel)")
     handlebar: bpy.props.PointerProperty(type=bpy.types.Object, name="Handlebar", description="Steering Handlebar")
+    suspension_f: bpy.props.PointerProperty(type=bpy.types.Object, name="Front Suspension", description="Fork slider (lower legs), slides with the front wheel")
+    suspension_b: bpy.props.PointerProperty(type=bpy.types.Object, name="Back Suspension", description="Swingarm or shock part that moves with the rear wheel")
     
-    # Suspension (Optional for now)
-    # suspension_f: bpy.props.PointerProperty(type=bpy.types.Object, name="Front Suspension")
-    # suspension_b: bpy.props.PointerProperty(type=bpy.types.Object, name="Back Suspension")
+    source_collection: bpy.props.PointerProperty(type=bpy.types.Collection, name="Bike", description="Collection of a bike model to detect the components in")
+    update_existing: bpy.props.BoolProperty(name="Update Existing Rig", default=True, description="Update the rig the parts already belong to in place instead of building a new one")
+    use_templates: bpy.props.BoolProperty(name="Reuse Rigs of Same Model", default=True, description="Copy the rig of an already rigged identical bike instead of building the bones and drivers again")
+    share_data: bpy.props.BoolProperty(name="Share Armature Data", default=False, description="Let rigs of identical bikes share one armature datablock, only pose and drivers are per bike")
+    fleet_collection: bpy.props.PointerProperty(type=bpy.types.Collection, name="Fleet", description="Collection holding one child collection per bike")
+    lean_smoothing: bpy.props.IntProperty(name="Smoothing", default=5, min=1, max=100, description="Number of frames the baked lean is averaged over")
+    ground_collection: bpy.props.PointerProperty(type=bpy.types.Collection, name="Ground", description="Collection of the meshes bikes ride on")
+    ground_mode: bpy.props.EnumProperty(name="Ground Query", default='BVH', items=[
+        ('BVH', "Ray Cast", "Exact ray casts against the ground meshes"),
+        ('HEIGHTFIELD', "Heightfield", "Rasterize the ground once and interpolate heights, fastest on big terrains"),
+    ], description="How ground heights under the wheels are found")
+    heightfield_cell: bpy.props.FloatProperty(name="Cell Size", default=0.25, min=0.01, unit='LENGTH', description="Grid spacing of the ground heightfield")
+    bake_tolerance: bpy.props.FloatProperty(name="Tolerance", default=0.001, min=0.0, precision=4, description="Largest error (in radians or scene units) allowed when thinning out baked keys, 0 keeps a key on every frame")
+    speed_mode: bpy.props.EnumProperty(name="Speed", default='FIT', items=[
+        ('CONSTANT', "Constant", "Cover the path at one speed over the scene range"),
+        ('FIT', "Fit Range", "Accelerate, corner and brake within the limits, arriving on the last frame"),
+        ('FASTEST', "Fastest", "Time optimal within the limits, the bike waits at the end once it arrives"),
+    ], description="How the bike's speed along its path is chosen")
+    max_speed: bpy.props.FloatProperty(name="Top Speed", default=15.0, min=0.1, unit='VELOCITY', description="Highest speed on the path")
+    acceleration: bpy.props.FloatProperty(name="Acceleration", default=2.0, min=0.01, unit='ACCELERATION', description="Highest forward acceleration")
+    braking: bpy.props.FloatProperty(name="Braking", default=4.0, min=0.01, unit='ACCELERATION', description="Highest deceleration")
+    lateral_g: bpy.props.FloatProperty(name="Lateral G", default=0.5, min=0.01, max=2.0, description="Highest sideways acceleration in corners, in g")
+    lean_offset: bpy.props.FloatProperty(name="Offset", default=0.0, subtype='ANGLE', description="Extra lean into turns, e.g. when the rider stays upright (positive) or hangs off (negative)")
+    suspension_frequency: bpy.props.FloatProperty(name="Frequency", default=2.0, min=0.2, max=10.0, description="Natural frequency of the suspension in Hz, higher is stiffer")
+    suspension_damping: bpy.props.FloatProperty(name="Damping", default=0.5, min=0.0, max=2.0, description="Damping ratio, 1 settles without bouncing")
+    suspension_travel: bpy.props.FloatProperty(name="Travel", default=0.12, min=0.005, unit='LENGTH', description="Compression from the rest pose to the bump stop")
+    suspension_extension: bpy.props.FloatProperty(name="Extension", default=0.03, min=0.0, unit='LENGTH', description="Extension from the rest pose (sag) to the top out")
+
+class BikeRig_Preferences(bpy.types.AddonPreferences):
+    """Custom name tags used to find bike parts"""
+    bl_idname = __package__
+
+    use_custom_tags: bpy.props.BoolProperty(name="Use Custom Tags", default=False, description="Also search for these comma separated tags when finding bike parts by name")
+    tags_frame: bpy.props.StringProperty(name="Frame", default="")
+    tags_front_wheel: bpy.props.StringProperty(name="Front Wheel", default="")
+    tags_back_wheel: bpy.props.StringProperty(name="Back Wheel", default="")
+    tags_fork: bpy.props.StringProperty(name="Fork", default="")
+    tags_handlebar: bpy.props.StringProperty(name="Handlebar", default="")
+    tags_suspension_f: bpy.props.StringProperty(name="Front Suspension", default="")
+    tags_suspension_b: bpy.props.StringProperty(name="Back Suspension", default="")
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "use_custom_tags")
+        col = layout.column()
+        col.enabled = self.use_custom_tags
+        for role in ("frame", "front_wheel", "back_wheel", "fork", "handlebar", "suspension_f", "suspension_b"):
+            col.prop(self, "tags_" + role)
 
 class BikeRig_PT_MainPanel(bpy.types.Panel):
     """Creates a Panel in the 3D Viewport Sidebar"""
@@ -26,7 +78,11 @@ class BikeRig_PT_MainPanel(bpy.types.Panel):
         props = scene.bikerig_props
 
         layout.label(text="Select Components:", icon='OBJECT_DATA')
-        
+
+        row = layout.row(align=True)
+        row.prop(props, "source_collection")
+        row.operator("bikerig.detect_parts", text="", icon='VIEWZOOM')
+
         box = layout.box()
         box.prop(props, "frame")
         box.prop(props, "front_wheel")
@@ -39,16 +95,115 @@ class BikeRig_PT_MainPanel(bpy.types.Panel):
         box.prop(props, "handlebar")
 
         layout.separator()
+        layout.label(text="Suspension:")
+        box = layout.box()
+        box.prop(props, "suspension_f")
+        box.prop(props, "suspension_b")
+
+        layout.separator()
+        layout.prop(props, "update_existing")
+        layout.prop(props, "use_templates")
+        row = layout.row()
+        row.enabled = props.use_templates
+        row.prop(props, "share_data")
         layout.operator("bikerig.build_rig", text="Generate Rig", icon='ARMATURE_DATA')
 
-classes = [BikeRig_Properties, BikeRig_PT_MainPanel]
+        rig = context.object
+        if rig and "bikerig_rake" in rig:
+            layout.separator()
+            layout.label(text="Steering Geometry:", icon='DRIVER_ROTATIONAL_DIFFERENCE')
+            box = layout.box()
+            box.label(text=f"Rake: {rig['bikerig_rake']:.1f}°")
+            box.label(text=f"Trail: {rig['bikerig_trail'] * 1000:.0f} mm")
+            box.label(text=f"Fork Offset: {rig['bikerig_fork_offset'] * 1000:.0f} mm")
+
+        if bake.is_rig(rig):
+            layout.separator()
+            layout.label(text="Animation:", icon='ACTION')
+            box = layout.box()
+            row = box.row(align=True)
+            baked = bake.is_spin_baked(rig)
+            row.label(text="Wheel Spin: " + ("Baked" if baked else "Live"))
+            row.operator("bikerig.bake_wheel_spin", text="Bake", icon='REC')
+            row.operator("bikerig.live_wheel_spin", text="Live", icon='DRIVER')
+            box.prop(props, "bake_tolerance")
+            box.prop(props, "ground_collection")
+            row = box.row(align=True)
+            row.prop(props, "ground_mode", text="")
+            if props.ground_mode == 'HEIGHTFIELD':
+                row.prop(props, "heightfield_cell")
+                row.operator("bikerig.build_heightfield", text="", icon='FILE_REFRESH')
+                info = props.ground_collection.get(ground.INFO_PROP) if props.ground_collection else None
+                if info:
+                    box.label(text=f"Heightfield error: max {info['error'][0] * 1000:.1f} mm, mean {info['error'][1] * 1000:.1f} mm")
+            box.operator("bikerig.bake_terrain", icon='MOD_SHRINKWRAP')
+            box.operator("bikerig.bake_steering", icon='DRIVER_ROTATIONAL_DIFFERENCE')
+            row = box.row(align=True)
+            row.prop(props, "lean_smoothing")
+            row.prop(props, "lean_offset")
+            box.operator("bikerig.bake_lean", icon='MOD_CURVE')
+            col = box.column(align=True)
+            row = col.row(align=True)
+            row.prop(props, "suspension_frequency")
+            row.prop(props, "suspension_damping")
+            row = col.row(align=True)
+            row.prop(props, "suspension_travel")
+            row.prop(props, "suspension_extension")
+            box.operator("bikerig.bake_suspension", icon='MOD_PHYSICS')
+            row = box.row(align=True)
+            row.prop(rig, "bikerig_path")
+            row.operator("bikerig.follow_path", text="", icon='CON_FOLLOWPATH')
+            lut = curves.get_lut(rig.bikerig_path)
+            if lut:
+                box.label(text=f"Path Length: {lut['lengths'][-1]:.2f} m")
+            box.prop(props, "speed_mode")
+            col = box.column(align=True)
+            col.enabled = props.speed_mode != 'CONSTANT'
+            col.prop(props, "max_speed")
+            col.prop(props, "acceleration")
+            col.prop(props, "braking")
+            col.prop(props, "lateral_g")
+            if "bikerig_top_speed" in rig:
+                box.label(text=f"Top Speed: {rig['bikerig_top_speed'] * 3.6:.0f} km/h, arrives after {rig['bikerig_arrival']:.1f} s")
+
+        layout.separator()
+        layout.label(text="Fleet:", icon='OUTLINER_COLLECTION')
+        box = layout.box()
+        box.prop(props, "fleet_collection")
+        progress = core.build_progress
+        if progress["running"]:
+            row = box.row(align=True)
+            row.progress(factor=progress["done"] / max(progress["total"], 1),
+                         text=f"{progress['done']}/{progress['total']} - ETA {progress['eta']:.0f} s")
+            row.operator("bikerig.cancel_build", text="", icon='CANCEL')
+        else:
+            row = box.row(align=True)
+            row.operator("bikerig.build_fleet", text="Generate Fleet Rigs", icon='ARMATURE_DATA')
+            row.operator("bikerig.build_fleet_modal", text="", icon='TIME')
+
+        box = layout.box()
+        row = box.row(align=True)
+        row.operator("bikerig.discover_bikes", icon='VIEWZOOM')
+        row.label(text=f"{len(scene.bikerig_bikes)} found")
+        row = box.row()
+        row.enabled = len(scene.bikerig_bikes) > 0
+        op = row.operator("bikerig.build_fleet", text="Generate Discovered Rigs", icon='ARMATURE_DATA')
+        op.source = 'DISCOVERED'
+
+classes = [BikeRig_Properties, BikeRig_Preferences, BikeRig_PT_MainPanel]
 
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     bpy.types.Scene.bikerig_props = bpy.props.PointerProperty(type=BikeRig_Properties)
+    bpy.types.Scene.bikerig_bikes = bpy.props.CollectionProperty(type=BikeRig_Properties)
+    bpy.types.Object.bikerig_path = bpy.props.PointerProperty(
+        type=bpy.types.Object, name="Path", poll=lambda self, obj: curves.is_curve(obj),
+        description="Curve the bike's front wheel is driven along")
 
 def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
+    del bpy.types.Object.bikerig_path
+    del bpy.types.Scene.bikerig_bikes
     del bpy.types.Scene.bikerig_props